@@ -0,0 +1,52 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Perfil de arranque rápido: carpeta (onedir) en lugar de un único .exe, así no hay que
+# descomprimir todo en un directorio temporal en cada inicio; sin UPX (descomprimir las DLL
+# también cuesta) y bytecode optimizado. Los módulos del tracker se importan de forma diferida
+# desde interfaz.py, por eso se listan explícitamente.
+
+
+a = Analysis(
+    ['interfaz.py'],
+    pathex=[],
+    binaries=[],
+    datas=[('logo.png', '.'), ('untrefLogo.jpg', '.')],
+    hiddenimports=['detectarweb', 'captura', 'inferencia', 'registro', 'movimiento', 'servos', 'pantalla',
+                   'exportacion', 'modelos', 'analisisDatos', 'metricas', 'grabacion', 'fuentes', 'zonas',
+                   'serial.tools.list_ports'],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=[],
+    noarchive=False,
+    optimize=1,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='Human Tracker',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon=['logo.ico'],
+)
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='Human Tracker',
+)
@@ -1,75 +1,193 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-
-# Leer el CSV sin encabezado y nombrar columnas
-try:
-    df = pd.read_csv("seguimiento.csv", encoding="latin1", header=None, names=["Frame", "ID", "Zona"])
-except FileNotFoundError:
-    print("No se encontró el archivo 'seguimiento.csv'. Verificá el nombre o la ruta.")
-    exit()
-
-# Limpiar espacios y estandarizar nombres
-df["Zona"] = df["Zona"].str.strip()
-
-# Mapear nombres de zonas
-mapeo_zonas = {
-    "Izquierda": "Izquierda",
-    "Centro-Izq": "Centro Izquierda",
-    "Centro-Der": "Centro Derecha",
-    "Derecha": "Derecha"
-}
-df["Zona"] = df["Zona"].map(mapeo_zonas)
-df = df[df["Zona"].notna()]
-
-# ========================
-# ANÁLISIS 1: Personas únicas por zona
-# ========================
-df_sin_duplicados = df.drop_duplicates(subset=["ID", "Zona"])
-conteo_unicos = df_sin_duplicados["Zona"].value_counts().reindex(
-    ["Izquierda", "Centro Izquierda", "Centro Derecha", "Derecha"], fill_value=0
-)
-
-# ========================
-# ANÁLISIS 2: Cantidad total de apariciones por zona
-# ========================
-conteo_total = df["Zona"].value_counts().reindex(
-    ["Izquierda", "Centro Izquierda", "Centro Derecha", "Derecha"], fill_value=0
-)
-
-# ========================
-# ANÁLISIS 7: Tiempo estimado en cada zona por persona (cantidad de frames)
-# ========================
-tiempo_por_zona = df.groupby(["ID", "Zona"]).size().reset_index(name="Frames")
-
-# ========================
-# EXPORTAR A EXCEL
-# ========================
-with pd.ExcelWriter("analisis_zonas_completo.xlsx") as writer:
-    conteo_unicos.to_frame(name="Personas únicas").to_excel(writer, sheet_name="Personas únicas por zona")
-    conteo_total.to_frame(name="Apariciones").to_excel(writer, sheet_name="Apariciones por zona")
-    tiempo_por_zona.to_excel(writer, sheet_name="Frames por zona por ID", index=False)
-
-print("📁 Archivo Excel 'analisis_zonas_completo.xlsx' generado con éxito.")
-
-# ========================
-# GRÁFICO COMPARATIVO
-# ========================
-fig, axs = plt.subplots(2, 1, figsize=(8, 8))
-
-# Personas únicas
-axs[0].bar(conteo_unicos.index, conteo_unicos.values, color='skyblue')
-axs[0].set_title("Personas únicas por zona")
-axs[0].set_ylabel("Cantidad de personas")
-
-# Apariciones totales
-axs[1].bar(conteo_total.index, conteo_total.values, color='salmon')
-axs[1].set_title("Apariciones totales por zona")
-axs[1].set_ylabel("Cantidad de apariciones")
-
-for ax in axs:
-    ax.set_xticks(range(len(conteo_total.index)))
-    ax.set_xticklabels(conteo_total.index, rotation=15)
-
-plt.tight_layout()
-plt.savefig("analisis_zonas_completo.png", dpi=300)
-plt.show()
+import os
+import re
+import sys
+
+from zonas import ZONAS_POR_DEFECTO, cargar_zonas, mapeo_etiquetas
+
+# Zonas del modo vidriera y su nombre para los reportes (por defecto las cuatro franjas; con
+# --zones-config, las del mismo archivo que usó detectarweb)
+mapeo_zonas = mapeo_etiquetas(ZONAS_POR_DEFECTO)
+ORDEN_ZONAS = list(mapeo_zonas.values())
+
+
+# Resultado parcial combinable: se calcula por bloque/archivo en cualquier proceso y se suma
+# con `combinar`. Los IDs se reinician en cada sesión del tracker, por eso la clave de una
+# persona es (sesión, ID) (ver sesion_de).
+class ParcialZonas:
+    def __init__(self):
+        self.personas = {}      # zona -> conjunto de (sesión, ID)
+        self.apariciones = {}   # zona -> cantidad de filas
+        self.frames = {}        # (sesión, ID, zona) -> cantidad de frames
+
+    def agregar(self, sesion, idp, zona, n=1):
+        self.personas.setdefault(zona, set()).add((sesion, idp))
+        self.apariciones[zona] = self.apariciones.get(zona, 0) + n
+        clave = (sesion, idp, zona)
+        self.frames[clave] = self.frames.get(clave, 0) + n
+
+    def combinar(self, otro):
+        for zona, personas in otro.personas.items():
+            self.personas.setdefault(zona, set()).update(personas)
+        for zona, n in otro.apariciones.items():
+            self.apariciones[zona] = self.apariciones.get(zona, 0) + n
+        for clave, n in otro.frames.items():
+            self.frames[clave] = self.frames.get(clave, 0) + n
+        return self
+
+
+# Sesión del tracker a la que pertenece un registro: su nombre sin extensión ni sufijo de rotación.
+# seguimiento_x.csv, seguimiento_x_parte1.csv, ... (o las carpetas .npz) son la misma sesión y los
+# IDs continúan entre partes; seguimiento_x_1.csv es otra sesión.
+def sesion_de(ruta):
+    nombre = os.path.splitext(os.path.basename(os.path.normpath(ruta)))[0]
+    return re.sub(r"_parte\d+$", "", nombre)
+
+
+# Lee un registro de seguimiento por bloques (CSV, Parquet o NPZ) y devuelve su ParcialZonas.
+# Nunca tiene más de un bloque en memoria.
+def analizar_archivo(ruta, filas_bloque=500_000, mapeo=None):
+    mapeo = mapeo if mapeo is not None else mapeo_zonas
+    parcial = ParcialZonas()
+    sesion = sesion_de(ruta)
+    for bloque in leer_bloques(ruta, filas_bloque):
+        # Limpiar espacios y estandarizar nombres
+        zonas = bloque["Zona"].astype(str).str.strip().map(mapeo)
+        bloque = bloque.assign(Zona=zonas)[zonas.notna()]
+        if bloque.empty:
+            continue
+        # value_counts/groupby sobre el bloque; el parcial acumula solo los agregados
+        for (idp, zona), n in bloque.groupby(["ID", "Zona"]).size().items():
+            parcial.agregar(sesion, int(idp), zona, int(n))
+    return parcial
+
+
+def leer_bloques(ruta, filas_bloque):
+    import pandas as pd
+
+    if ruta.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        pf = pq.ParquetFile(ruta, memory_map=True)
+        for lote in pf.iter_batches(batch_size=filas_bloque, columns=["frame", "id", "zona"]):
+            yield lote.to_pandas().rename(columns={"frame": "Frame", "id": "ID", "zona": "Zona"})
+    elif ruta.endswith(".npz") and os.path.isdir(ruta):
+        import numpy as np
+        for nombre in sorted(os.listdir(ruta)):
+            with np.load(os.path.join(ruta, nombre)) as b:
+                yield pd.DataFrame({"Frame": b["frame"], "ID": b["id"], "Zona": b["zonas"][b["zona"]]})
+    else:
+        # Leer el CSV sin encabezado y nombrar columnas (la fila de encabezado se descarta al mapear zonas)
+        for bloque in pd.read_csv(ruta, encoding="latin1", header=None, names=["Frame", "ID", "Zona"], chunksize=filas_bloque):
+            yield bloque
+
+
+# Analiza todos los registros combinando los parciales de cada archivo, en paralelo si hay varios.
+# El mapeo de zonas se pasa explícito: los procesos de trabajo no ven cambios a los globales.
+def analizar(rutas, procesos=None, filas_bloque=500_000, mapeo=None):
+    total = ParcialZonas()
+    if len(rutas) <= 1 or procesos == 1:
+        for ruta in rutas:
+            total.combinar(analizar_archivo(ruta, filas_bloque, mapeo))
+        return total
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=procesos) as ex:
+        for parcial in ex.map(analizar_archivo, rutas, [filas_bloque] * len(rutas), [mapeo] * len(rutas)):
+            total.combinar(parcial)
+    return total
+
+
+# Tablas finales a partir del resultado combinado
+def tablas(total, orden=None):
+    import pandas as pd
+
+    orden = orden if orden is not None else ORDEN_ZONAS
+    # ANÁLISIS 1: Personas únicas por zona
+    conteo_unicos = pd.Series([len(total.personas.get(z, ())) for z in orden], index=orden, name="Zona")
+    # ANÁLISIS 2: Cantidad total de apariciones por zona
+    conteo_total = pd.Series([total.apariciones.get(z, 0) for z in orden], index=orden, name="Zona")
+    # ANÁLISIS 7: Tiempo estimado en cada zona por persona (cantidad de frames)
+    tiempo_por_zona = pd.DataFrame(
+        [(sesion, idp, zona, n) for (sesion, idp, zona), n in sorted(total.frames.items())],
+        columns=["Sesión", "ID", "Zona", "Frames"],
+    )
+    return conteo_unicos, conteo_total, tiempo_por_zona
+
+
+def exportar(conteo_unicos, conteo_total, tiempo_por_zona, salida, mostrar=True):
+    import pandas as pd
+    import matplotlib.pyplot as plt
+
+    # ========================
+    # EXPORTAR A EXCEL
+    # ========================
+    with pd.ExcelWriter(f"{salida}.xlsx") as writer:
+        conteo_unicos.to_frame(name="Personas únicas").to_excel(writer, sheet_name="Personas únicas por zona")
+        conteo_total.to_frame(name="Apariciones").to_excel(writer, sheet_name="Apariciones por zona")
+        tiempo_por_zona.to_excel(writer, sheet_name="Frames por zona por ID", index=False)
+
+    print(f"📁 Archivo Excel '{salida}.xlsx' generado con éxito.")
+
+    # ========================
+    # GRÁFICO COMPARATIVO
+    # ========================
+    fig, axs = plt.subplots(2, 1, figsize=(8, 8))
+
+    # Personas únicas
+    axs[0].bar(conteo_unicos.index, conteo_unicos.values, color='skyblue')
+    axs[0].set_title("Personas únicas por zona")
+    axs[0].set_ylabel("Cantidad de personas")
+
+    # Apariciones totales
+    axs[1].bar(conteo_total.index, conteo_total.values, color='salmon')
+    axs[1].set_title("Apariciones totales por zona")
+    axs[1].set_ylabel("Cantidad de apariciones")
+
+    for ax in axs:
+        ax.set_xticks(range(len(conteo_total.index)))
+        ax.set_xticklabels(conteo_total.index, rotation=15)
+
+    plt.tight_layout()
+    plt.savefig(f"{salida}.png", dpi=300)
+    if mostrar:
+        plt.show()
+
+
+# Expande los patrones (también en Windows, donde la consola no lo hace)
+def buscar_registros(patrones):
+    import glob
+
+    rutas = []
+    for patron in patrones:
+        for ruta in sorted(glob.glob(patron)) or ([patron] if os.path.exists(patron) else []):
+            if ruta not in rutas:
+                rutas.append(ruta)
+    return rutas
+
+
+def main(args_list=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Análisis de zonas a partir de registros de seguimiento")
+    parser.add_argument("registros", nargs="*", default=["seguimiento.csv"], help="Archivos o patrones (ej. output/seguimiento_*.csv)")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos en paralelo (por defecto, uno por núcleo)")
+    parser.add_argument("--filas-bloque", type=int, default=500_000, help="Filas leídas por bloque")
+    parser.add_argument("--salida", default="analisis_zonas_completo", help="Nombre base del Excel y el gráfico")
+    parser.add_argument("--no-mostrar", action="store_true", help="No abrir la ventana del gráfico")
+    parser.add_argument("--zones-config", help="Archivo de zonas (el mismo --zones-config de detectarweb)")
+    args = parser.parse_args(args_list)
+
+    rutas = buscar_registros(args.registros)
+    if not rutas:
+        print(f"No se encontró ningún registro para {', '.join(args.registros)}. Verificá el nombre o la ruta.")
+        return
+
+    mapeo = mapeo_etiquetas(cargar_zonas(args.zones_config))
+    orden = list(dict.fromkeys(mapeo.values()))
+    total = analizar(rutas, args.procesos, args.filas_bloque, mapeo)
+    exportar(*tablas(total, orden), args.salida, mostrar=not args.no_mostrar)
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
+    main(sys.argv[1:])
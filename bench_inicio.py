@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+import time
+
+
+# Medición del arranque de la interfaz: tiempo hasta que la primera ventana está dibujada y
+# costo de importación por módulo (python -X importtime). También puede medir un ejecutable
+# generado con PyInstaller (--exe), en cuyo caso solo se informa el tiempo hasta la ventana.
+def lanzar(cmd):
+    import tempfile
+
+    env = dict(os.environ, HUMAN_TRACKER_BENCH_INICIO="1")
+    # stderr va a un archivo temporal: -X importtime escribe mucho ahí y, con un pipe que nadie
+    # lee mientras se espera la ventana, el proceso se bloquearía al llenarse el buffer
+    with tempfile.TemporaryFile(mode="w+") as f_err:
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, stderr=f_err, text=True)
+        ventana = None
+        for linea in proc.stdout:
+            if linea.strip() == "VENTANA_LISTA":
+                ventana = time.perf_counter() - t0
+                break
+        proc.communicate(timeout=120)
+        f_err.seek(0)
+        err = f_err.read()
+    if ventana is None:
+        raise RuntimeError(f"La interfaz no llegó a mostrar la ventana:\n{err[-2000:]}")
+    return ventana, err
+
+
+# Suma el costo acumulado de cada import de primer nivel, agrupado por paquete
+def costo_imports(salida_importtime):
+    costos = {}
+    for linea in salida_importtime.splitlines():
+        if not linea.startswith("import time:") or "|" not in linea:
+            continue
+        _, acumulado, nombre = linea[len("import time:"):].split("|")
+        if nombre.startswith("  ") or not acumulado.strip().isdigit():
+            continue  # imports anidados: ya están incluidos en el acumulado de su padre
+        paquete = nombre.strip().split(".")[0]
+        costos[paquete] = costos.get(paquete, 0) + int(acumulado)
+    return sorted(costos.items(), key=lambda kv: kv[1], reverse=True)
+
+
+def main(args_list=None):
+    import argparse
+    import statistics
+
+    parser = argparse.ArgumentParser(description="Tiempo de arranque de la interfaz de Human Tracker")
+    parser.add_argument("--script", default="interfaz.py")
+    parser.add_argument("--exe", help="Medir un ejecutable ya generado en lugar del script")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="Módulos a listar")
+    args = parser.parse_args(args_list)
+
+    cmd = [args.exe] if args.exe else [sys.executable, "-X", "importtime", args.script]
+    tiempos = []
+    err = ""
+    for _ in range(args.repeticiones):
+        t, err = lanzar(cmd)
+        tiempos.append(t)
+
+    print(f"Tiempo hasta la primera ventana: mediana {statistics.median(tiempos):.3f} s "
+          f"(mín {min(tiempos):.3f} s, máx {max(tiempos):.3f} s, {len(tiempos)} ejecuciones)")
+
+    if not args.exe:
+        print(f"\n{'Módulo':<30}{'Importación (ms)':>18}")
+        for paquete, us in costo_imports(err)[:args.top]:
+            print(f"{paquete:<30}{us / 1000:>18.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,244 @@
+import os
+import sys
+import time
+
+from detectarweb import HumanTracker, crear_parser
+
+# Benchmark reproducible del pipeline por etapas, sin cámara, sin Arduino y sin GPU:
+#   - Video sintético con N "personas" (rectángulos de color que se mueven sobre un fondo gris),
+#     generado a partir de una semilla, o un clip grabado (--clip).
+#   - Detector sintético determinista en lugar de YOLO (--detector yolo para medir el modelo real).
+#   - Rendimiento total (FPS) y p50/p95/p99 por etapa: capture, detect, associate, track_memory,
+#     draw, log_servo, write y display ("detect" se mide por llamada al modelo, es decir por lote).
+# Las opciones que no son del benchmark se pasan a detectarweb, así se puede medir cualquier
+# configuración (--detect-every 3, --batch-size 4, --roi ..., etc.).
+ETAPAS = ("capture", "detect", "associate", "track_memory", "draw", "log_servo", "write", "display")
+
+
+# Video de prueba: fondo gris texturado (sin saturación) y personas de colores saturados que
+# rebotan en los bordes. Con la misma semilla el video es siempre el mismo.
+def generar_video(ruta, n_personas=5, n_frames=300, tam=(1280, 720), fps=30.0, semilla=0):
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(semilla)
+    w, h = tam
+    fondo = cv2.GaussianBlur(rng.integers(70, 150, (h, w), dtype=np.uint8), (0, 0), 3)
+    fondo = cv2.cvtColor(fondo, cv2.COLOR_GRAY2BGR)
+
+    colores = [(0, 0, 230), (0, 200, 0), (230, 0, 0), (0, 200, 230), (230, 0, 200), (230, 200, 0)]
+    personas = []
+    for i in range(n_personas):
+        pw, ph = int(rng.integers(40, 70)), int(rng.integers(100, 180))
+        personas.append({
+            "pos": [float(rng.uniform(20, w - pw - 20)), float(rng.uniform(20, h - ph - 20))],
+            "vel": [float(rng.uniform(-8, 8)), float(rng.uniform(-3, 3))],
+            "tam": (pw, ph),
+            "color": colores[i % len(colores)],
+        })
+
+    out = cv2.VideoWriter(ruta, cv2.VideoWriter_fourcc(*"MJPG"), fps, tam)
+    if not out.isOpened():
+        raise RuntimeError(f"No se pudo crear el video sintético {ruta}.")
+    for _ in range(n_frames):
+        frame = fondo.copy()
+        for p in personas:
+            pw, ph = p["tam"]
+            for eje, limite in ((0, w - pw), (1, h - ph)):
+                p["pos"][eje] += p["vel"][eje]
+                if not 0 <= p["pos"][eje] <= limite:
+                    p["vel"][eje] = -p["vel"][eje]
+                    p["pos"][eje] = min(max(p["pos"][eje], 0), limite)
+            x, y = int(p["pos"][0]), int(p["pos"][1])
+            cv2.rectangle(frame, (x, y), (x + pw, y + ph), p["color"], -1)
+        out.write(frame)
+    out.release()
+    return ruta
+
+
+# Resultados con la misma forma que los de ultralytics (r.boxes.data.cpu().numpy())
+class _Tensor:
+    def __init__(self, datos):
+        self.datos = datos
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.datos
+
+
+class _Resultado:
+    def __init__(self, cajas):
+        from types import SimpleNamespace
+        self.boxes = SimpleNamespace(data=_Tensor(cajas))
+
+
+# Detector determinista para los videos sintéticos: cada región saturada es una persona.
+# `latencia_ms` (por llamada) y `latencia_frame_ms` (por frame del lote) simulan el costo de un
+# modelo real, para medir cómo se superponen captura, inferencia y seguimiento.
+class ModeloSintetico:
+    def __init__(self, latencia_ms=0.0, latencia_frame_ms=0.0, area_min=300):
+        self.latencia_ms = latencia_ms
+        self.latencia_frame_ms = latencia_frame_ms
+        self.area_min = area_min
+
+    def predict(self, frames, imgsz=640, conf=0.25, classes=None, verbose=False):
+        if not isinstance(frames, list):
+            frames = [frames]
+        espera = self.latencia_ms + self.latencia_frame_ms * len(frames)
+        if espera > 0:
+            time.sleep(espera / 1000)
+        return [_Resultado(self.detectar(f)) for f in frames]
+
+    def detectar(self, frame):
+        import cv2
+        import numpy as np
+
+        saturacion = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)[:, :, 1]
+        mascara = (saturacion > 120).astype(np.uint8)
+        n, _, stats, _ = cv2.connectedComponentsWithStats(mascara)
+        cajas = [(x, y, x + w, y + h, 0.9, 0) for x, y, w, h, area in stats[1:n] if area >= self.area_min]
+        return np.array(cajas, dtype=np.float32).reshape(-1, 6)
+
+
+# HumanTracker con el detector elegido y el cronómetro de etapas encendido
+class TrackerBenchmark(HumanTracker):
+    def __init__(self, args, modelo, cronometro):
+        self.modelo_bench = modelo
+        super().__init__(args)
+        self.metricas = cronometro
+
+    def cargar_modelo(self):
+        return self.modelo_bench if self.modelo_bench is not None else super().cargar_modelo()
+
+    # Sin ventana: "display" mide la reducción y conversión que haría Renderizador.mostrar
+    def procesar_frame(self, frame, idx=None, detecciones=None, detectar=None, t=None):
+        super().procesar_frame(frame, idx, detecciones, detectar, t)
+        if self.render:
+            with self.metricas.etapa("display"):
+                self.render.convertir(self.frame)
+
+
+def ejecutar(args_tracker, modelo, cronometro, carpeta, tam_display):
+    from pantalla import Renderizador
+
+    tracker = TrackerBenchmark(crear_parser().parse_args(args_tracker), modelo, cronometro)
+    tracker.output_dir = carpeta
+    if tam_display:
+        tracker.render = Renderizador(None, 0, tam_fijo=tam_display)
+    tracker.preparar()
+
+    t0 = time.perf_counter()
+    tracker.process()
+    return tracker.captura.leidos, time.perf_counter() - t0
+
+
+def imprimir(resultado):
+    print(f"\n{resultado['frames']} frames en {resultado['segundos']:.2f} s -> {resultado['fps']:.1f} FPS")
+    print(f"{'Etapa':<14}{'n':>8}{'media':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'máx':>10}  (ms)")
+    etapas = resultado["etapas"]
+    for nombre in [e for e in ETAPAS if e in etapas] + [e for e in etapas if e not in ETAPAS]:
+        r = etapas[nombre]
+        print(f"{nombre:<14}{r['n']:>8}{r['media_ms']:>10.2f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+              f"{r['p99_ms']:>10.2f}{r['max_ms']:>10.2f}")
+
+
+# Compara contra un resultado guardado con --json: FPS y p50/p95 de cada etapa.
+# Devuelve la lista de regresiones que superan la tolerancia (en %).
+def comparar(resultado, base, tolerancia):
+    regresiones = []
+    if resultado["fps"] < base["fps"] * (1 - tolerancia / 100):
+        regresiones.append(f"FPS: {base['fps']:.1f} -> {resultado['fps']:.1f}")
+    for nombre, r in resultado["etapas"].items():
+        b = base["etapas"].get(nombre)
+        if not b:
+            continue
+        for clave in ("p50_ms", "p95_ms"):
+            # Se ignoran diferencias menores a 0.05 ms: son ruido del reloj, no regresiones
+            if r[clave] > b[clave] * (1 + tolerancia / 100) and r[clave] - b[clave] > 0.05:
+                regresiones.append(f"{nombre} {clave[:3]}: {b[clave]:.2f} ms -> {r[clave]:.2f} ms")
+    return regresiones
+
+
+def main(args_list=None):
+    import argparse
+    import json
+    from metricas import Cronometro
+
+    parser = argparse.ArgumentParser(description="Benchmark por etapas del pipeline de Human Tracker (CPU, sin conexión)")
+    parser.add_argument("--clip", help="Clip grabado a usar en lugar del video sintético")
+    parser.add_argument("--personas", type=int, default=5, help="Personas en el video sintético")
+    parser.add_argument("--frames", type=int, default=300, help="Frames del video sintético")
+    parser.add_argument("--tam", default="1280x720", help="Resolución del video sintético")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--detector", choices=("sintetico", "yolo"), default="sintetico",
+                        help="Detector sintético determinista o el modelo YOLO real (--yolo-model, --backend)")
+    parser.add_argument("--latencia-detector", type=float, default=0.0, help="Costo simulado por llamada al detector sintético (ms)")
+    parser.add_argument("--latencia-frame", type=float, default=0.0, help="Costo simulado por frame del detector sintético (ms)")
+    parser.add_argument("--display", default="960x540", help="Tamaño de la conversión para pantalla, o 'no'")
+    parser.add_argument("--repeticiones", type=int, default=1)
+    parser.add_argument("--carpeta", default="bench", help="Carpeta para el video sintético y las salidas")
+    parser.add_argument("--json", help="Guardar el resultado en este archivo")
+    parser.add_argument("--comparar", help="Resultado de referencia (--json de una corrida anterior)")
+    parser.add_argument("--tolerancia", type=float, default=15.0, help="Regresión tolerada contra --comparar (%%)")
+    propios, comunes = parser.parse_known_args(args_list)
+
+    os.makedirs(propios.carpeta, exist_ok=True)
+    if propios.clip:
+        video = propios.clip
+        if propios.detector == "sintetico":
+            print("Aviso: el detector sintético solo reconoce las personas de los videos sintéticos.")
+    else:
+        w, h = map(int, propios.tam.split("x"))
+        video = os.path.join(propios.carpeta, f"sintetico_{propios.personas}p_{propios.frames}f_{w}x{h}_s{propios.semilla}.avi")
+        if not os.path.exists(video):
+            print(f"Generando {video}...")
+            generar_video(video, propios.personas, propios.frames, (w, h), semilla=propios.semilla)
+
+    # Por defecto se procesa a la resolución del video; --resolution en `comunes` lo reemplaza
+    if "--resolution" not in comunes and not propios.clip:
+        comunes = ["--resolution", propios.tam] + comunes
+    args_tracker = ["--video", video, "--out-base", "bench", "--headless"] + comunes
+    tam_display = None if propios.display == "no" else tuple(map(int, propios.display.split("x")))
+
+    modelo = None
+    if propios.detector == "sintetico":
+        modelo = ModeloSintetico(propios.latencia_detector, propios.latencia_frame)
+
+    cronometro = Cronometro()
+    frames = segundos = 0
+    for _ in range(max(1, propios.repeticiones)):
+        n, s = ejecutar(args_tracker, modelo, cronometro, propios.carpeta, tam_display)
+        frames += n
+        segundos += s
+
+    resultado = {
+        "video": video,
+        "detector": propios.detector,
+        "args": comunes,
+        "frames": frames,
+        "segundos": segundos,
+        "fps": frames / segundos if segundos else 0.0,
+        "etapas": cronometro.resumen(),
+    }
+    imprimir(resultado)
+
+    if propios.json:
+        with open(propios.json, "w") as f:
+            json.dump(resultado, f, indent=2)
+
+    if propios.comparar:
+        with open(propios.comparar) as f:
+            base = json.load(f)
+        regresiones = comparar(resultado, base, propios.tolerancia)
+        if regresiones:
+            print(f"\nRegresiones respecto de {propios.comparar} (tolerancia {propios.tolerancia:.0f}%):")
+            for r in regresiones:
+                print(f"  {r}")
+            sys.exit(1)
+        print(f"\nSin regresiones respecto de {propios.comparar}.")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,183 @@
+import queue
+import threading
+
+from metricas import SIN_METRICAS
+
+
+# Hilo de captura: lee (y redimensiona) frames de un cv2.VideoCapture y los deja en una cola acotada,
+# así la decodificación se superpone con la inferencia en lugar de sumarse a ella.
+#   - Fuentes en vivo (cámara, YouTube, EarthCam): política "ultimo", si la cola está llena se
+#     descarta el frame más viejo para no acumular retraso.
+#   - Archivos de video: política "todos", el hilo espera lugar en la cola y no se pierde ningún frame.
+# Si una fuente en vivo deja de entregar frames y se pasó `reconectar(intento) -> cap o None`, el
+# hilo la reabre con backoff exponencial (0.5 s, 1 s, 2 s, ... hasta 30 s) en lugar de reintentar
+# la lectura del stream caído para siempre. La captura vieja se libera antes de reabrir (una
+# cámara local sigue ocupada mientras tenga un handle abierto).
+# El hilo es dueño de su VideoCapture (la inicial y las de cada reconexión) y la libera al terminar.
+# Con `max_atraso` (segundos, para streams HLS/HTTP) el hilo mide cuánto va detrás del frente del
+# stream: la diferencia entre el reloj y la posición del video (CAP_PROP_POS_MSEC), tomando como
+# referencia el momento en que estuvo más adelantado. Si el atraso supera `max_atraso`, descarta
+# frames con grab() (sin convertirlos) y solo hace retrieve() del más reciente.
+class CapturaHilo:
+    FALLOS_RECONEXION = 30  # lecturas fallidas seguidas (~0.3 s) antes de reconectar
+    ESPERA_INICIAL = 0.5
+    ESPERA_MAXIMA = 30.0
+
+    def __init__(self, cap, en_vivo, tam=None, tam_cola=0, metricas=SIN_METRICAS, reconectar=None, max_atraso=None):
+        self.cap = cap
+        self.en_vivo = en_vivo
+        self.politica = "ultimo" if en_vivo else "todos"
+        self.tam = tam  # (ancho, alto) de salida, o None para no redimensionar
+        self.cola = queue.Queue(maxsize=tam_cola if tam_cola > 0 else (1 if en_vivo else 8))
+        self.metricas = metricas  # etapa "capture": lectura + redimensionado de cada frame
+        self.reconectar = reconectar
+        self.max_atraso = max_atraso
+        self._d_min = None  # menor (reloj - posición del video) visto: el momento más cercano al frente
+        self._tomados = 0  # frames tomados con grab() desde la última conexión
+
+        # Estadísticas
+        self.leidos = 0
+        self.descartados = 0
+        self.reconexiones = 0
+        self.atraso = 0.0  # segundos detrás del frente del stream (con max_atraso)
+        self.drenados = 0  # frames descartados con grab() para alcanzar el frente
+
+        self.finalizado = False  # el consumidor ya recibió el fin del stream
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name="captura", daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        self._hilo.join(timeout=2)
+
+    # Devuelve (ok, indice_frame, instante_captura, frame). ok=False si no llegó un frame a tiempo
+    # o terminó el stream. El instante es time.monotonic() al leerlo. Con timeout=0 no bloquea.
+    def leer(self, timeout=0):
+        try:
+            item = self.cola.get(timeout=timeout) if timeout else self.cola.get_nowait()
+        except queue.Empty:
+            return False, None, None, None
+        if item is None:
+            self.finalizado = True
+            return False, None, None, None
+        return (True, *item)
+
+    def _bucle(self):
+        try:
+            self._capturar()
+        finally:
+            self.cap.release()
+
+    def _capturar(self):
+        import cv2
+        import time
+
+        fallos = 0
+        while not self._detener.is_set():
+            t0 = time.perf_counter()
+            ret, frame = self._leer() if self.max_atraso is not None else self.cap.read()
+            t = time.monotonic()
+            if not ret:
+                if self.en_vivo:
+                    fallos += 1
+                    if self.reconectar and fallos >= self.FALLOS_RECONEXION:
+                        self._reconectar()
+                        fallos = 0
+                    else:
+                        time.sleep(0.01)
+                    continue
+                break
+            fallos = 0
+
+            if self.tam and (frame.shape[1], frame.shape[0]) != self.tam:
+                frame = cv2.resize(frame, self.tam)
+            self.metricas.registrar("capture", time.perf_counter() - t0)
+
+            self.leidos += 1
+            self._encolar((self.leidos, t, frame))
+
+        # Marca de fin de stream
+        self._encolar(None)
+
+    def _reconectar(self):
+        self.cap.release()
+        espera = self.ESPERA_INICIAL
+        intento = 0
+        while not self._detener.is_set():
+            print(f"Sin frames de la fuente en vivo: reconectando (intento {intento + 1})...")
+            try:
+                cap = self.reconectar(intento)
+            except Exception as e:
+                print(f"Falló la reconexión: {e}")
+                cap = None
+            if cap is not None:
+                self.cap = cap
+                self._d_min = None  # la posición del video vuelve a empezar
+                self._tomados = 0
+                self.reconexiones += 1
+                return
+            intento += 1
+            self._detener.wait(espera)
+            espera = min(espera * 2, self.ESPERA_MAXIMA)
+
+    # Lectura de baja latencia: grab() hasta alcanzar el frente y retrieve() de ese frame
+    def _leer(self):
+        import time
+        import cv2
+
+        intervalo = 1.0 / (self.cap.get(cv2.CAP_PROP_FPS) or 30.0)
+        if not self.cap.grab():
+            return False, None
+        self._medir_atraso(intervalo)
+
+        if self.atraso > self.max_atraso:
+            # Se drena hasta la mitad del umbral (histéresis) o hasta que grab() tenga que
+            # esperar al stream, que es la señal de que ya no quedan frames viejos en el buffer
+            while self.atraso > self.max_atraso / 2 and not self._detener.is_set():
+                t0 = time.perf_counter()
+                if not self.cap.grab():
+                    return False, None
+                self.drenados += 1
+                self._medir_atraso(intervalo)
+                if time.perf_counter() - t0 > intervalo / 2:
+                    break
+        return self.cap.retrieve()
+
+    # Atraso respecto del frente: cuánto avanzó el reloj más que el video desde el momento en que
+    # se estuvo más adelantado. La posición del video es CAP_PROP_POS_MSEC o, si la fuente no la
+    # informa, los frames tomados por el intervalo entre frames.
+    def _medir_atraso(self, intervalo):
+        import time
+        import cv2
+
+        self._tomados += 1
+        pos = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+        if pos <= 0:
+            pos = self._tomados * intervalo
+        d = time.monotonic() - pos
+        self._d_min = d if self._d_min is None else min(self._d_min, d)
+        self.atraso = d - self._d_min
+
+    def _encolar(self, item):
+        if self.politica == "ultimo":
+            while True:
+                try:
+                    self.cola.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self.cola.get_nowait()
+                        self.descartados += 1
+                    except queue.Empty:
+                        pass
+        else:
+            while not self._detener.is_set():
+                try:
+                    self.cola.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
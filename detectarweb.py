@@ -1,8 +1,6 @@
 class HumanTracker:
     def __init__(self, args):
         import time
-        from ultralytics import YOLO
-        import warnings
 
         self.args = args
 
@@ -10,6 +8,10 @@ class HumanTracker:
         self.res_w, self.res_h = map(int, args.resolution.split("x"))
         self.fps = args.fps
 
+        # Región de interés y tamaño de inferencia
+        self.roi = self.parsear_roi(args.roi)
+        self.imgsz = self.elegir_imgsz(args.imgsz)
+
         # Base rotativa
         self.baseX, self.baseY = args.servo_base_x , args.servo_base_y
         self.servoPos = [self.baseX, self.baseY]
@@ -20,26 +22,53 @@ class HumanTracker:
         self.board = None
         self.servo_x = None
         self.servo_y = None
+        self.servos = None  # CanalServos: escritura asíncrona y limitada
 
         # Modelo YOLO
-        warnings.filterwarnings("ignore", message=".*autocast.*")
-        self.model = YOLO(str(args.yolo_model) + ".pt")
+        self.model = self.cargar_modelo()
 
         # Seguimiento
         self.cands = {}
+        self.cands_visto = {}  # ID -> paso de seguimiento en que se detectó por última vez
+        self.cand_ttl = args.cand_ttl
+        self.n_pasos = 0  # frames procesados (con o sin detección)
+        self.movimiento = {}  # ID -> VelocidadConstante
+        self.desde_deteccion = 0  # frames seguidos sin correr el detector
+        self.compuerta = None
+        if args.motion_gate:
+            from movimiento import CompuertaMovimiento
+            self.compuerta = CompuertaMovimiento(args.motion_threshold)
+        self.filtros = {}  # ID -> FiltroKalman (posición y velocidad del centro, en segundos)
+        self.t_frame = None
+        self.latencia_pipeline = None  # media móvil (s) entre captura y orden al servo
         self.next_id = 0
         self.UMBRAL = 50
         self.id_actual = None
         self.persona_actual = None
         self.frames_perdido = 0
-        self.log = []
+        self.registro = None
+        self.zonas = None  # EstadisticasZonas: agregados por zona en vivo
         self.confianza = args.conf_threshold
         self.frames_perdidos_max = args.max_lost_frames
         self.track_memory = {} 
 
+        # Tiempos por etapa (ver metricas.py); apagado no mide nada
+        from metricas import SIN_METRICAS
+        self.metricas = SIN_METRICAS
+        self.telemetria = None
+        if args.stats_file or args.stats_port or args.stats_overlay:
+            from metricas import Telemetria
+            self.telemetria = Telemetria(self.estado_telemetria, args.stats_interval, args.stats_file, args.stats_port)
+            self.metricas = self.telemetria.cronometro
+
         # Capturas y salidas
         self.cap = None
         self.cap_sec = None
+        self.captura = None
+        self.captura_sec = None
+        self.inferencia = None
+        self.en_vivo = bool(args.youtube or args.earthcam or args.live or args.camera is not None)
+        self.frame_idx = 0
         self.out = None
         self.out_sec = None
         self.csv_out = None
@@ -48,13 +77,22 @@ class HumanTracker:
         self.root = None
         self.canvas = None
         self.canvas_sec = None
+        self.render = None
+        self.render_sec = None
 
         # Imagenes
         self.frame = None
         self.frame2 = None
 
+        # Zonas (modo vidriera): polígonos de --zones-config, o cuatro franjas verticales,
+        # rasterizados una sola vez en una máscara con el índice de zona de cada píxel
+        from zonas import cargar_zonas, mascara_zonas, poligonos_px
+        self.zonas_config = cargar_zonas(args.zones_config)
+        self.etiquetas = [z["nombre"] for z in self.zonas_config]
+        self.mapa_zonas = mascara_zonas(self.zonas_config, self.res_w, self.res_h)
+        self.poligonos_zonas = poligonos_px(self.zonas_config, self.res_w, self.res_h) if args.zones_config else []
+
         # Constantes
-        self.etiquetas = ["Izquierda", "Centro-Izq", "Centro-Der", "Derecha"]
         self.opacidad_secundaria = 0.5 # Opacidad de la cámara secundaria
 
         # Rutas de salida
@@ -65,13 +103,32 @@ class HumanTracker:
         self.csv_base = None
         self.nombre_base = None
 
+    # Carga del modelo YOLO (las subclases pueden reemplazarlo, ver multifuente.py).
+    # Con --backend onnxruntime/openvino se exporta una vez y se reutiliza el archivo exportado.
+    # El modelo queda en el registro del proceso, así la siguiente ejecución no lo recarga.
+    def cargar_modelo(self):
+        import modelos
+
+        return modelos.obtener(str(self.args.yolo_model), self.args.backend, self.imgsz, self.args.int8,
+                               self.args.calib_video, self.args.calib_frames)
+
     def run(self):
+        self.preparar()
+
+        if self.args.headless:
+            self.process()
+            return
+
+        self.iniciar_ventana()
+        self.actualizar_frame()
+        self.root.mainloop()
+        self.finalizar()
+
+    # Apertura de fuentes, salidas y placa Arduino
+    def preparar(self):
         import os
         import cv2
         import time
-        import csv
-        from PIL import Image, ImageTk
-        import tkinter as tk
 
         # Crear carpeta 'output' si no existe
         os.makedirs(self.output_dir, exist_ok=True)
@@ -85,9 +142,20 @@ class HumanTracker:
         self.vid_out = self.unico(self.base, "avi") if not self.args.no_save else None
         self.vid_out_sec = self.unico(vid_sec_base, "avi") if self.args.camera_sec and not self.args.no_save else None
 
-        # Extraer nombre base sin extensión para usar en el CSV
+        # Extraer nombre base sin extensión para usar en el registro (CSV, Parquet o NPZ).
+        # Se construye acá para fallar antes de abrir la fuente si falta una dependencia (pyarrow)
+        from registro import FORMATOS
+        clase_registro = FORMATOS[self.args.log_format]
         self.csv_base = os.path.join(self.output_dir, f"seguimiento_{self.nombre_base}")
-        self.csv_out = self.unico(self.csv_base, "csv") if not self.args.no_save else None
+        self.csv_out = self.unico(self.csv_base, clase_registro.EXTENSION) if not self.args.no_save else None
+        if self.csv_out:
+            self.registro = clase_registro(self.csv_out, self.args.log_flush_rows, self.args.log_flush_secs,
+                                           self.args.log_rotate_mb, self.args.log_rotate_min)
+
+        # Abrir fuente de video antes de crear archivos e hilos: si falla no queda nada abierto
+        self.cap = self.abrir_fuente_principal()
+        if not self.cap or not self.cap.isOpened():
+            raise RuntimeError("No se pudo abrir el stream o video. Asegúrate de que la fuente es válida y accesible.") from None
 
         # Inicialización de la placa Arduino y servos
         if self.args.camera_doble:
@@ -100,20 +168,33 @@ class HumanTracker:
                 self.servo_x.write(self.servoPos[0])
                 self.servo_y.write(self.servoPos[1])
                 time.sleep(0.5)
+                from servos import CanalServos
+                self.servos = CanalServos(self.servo_x, self.servo_y, self.servoPos,
+                                          self.args.servo_rate, self.args.servo_deadband).iniciar()
             except Exception as e:
                 print("Error al inicializar servos:", e)
+                self.cap.release()
                 raise RuntimeError(f"No se pudo inicializar la placa Arduino en {self.args.com}. Asegúrate de que el puerto es correcto y la placa está conectada.") from e
 
-        # Abrir fuente de video
-        self.cap = self.abrir_fuente_principal()
-        if not self.cap or not self.cap.isOpened():
-            raise RuntimeError("No se pudo abrir el stream o video. Asegúrate de que la fuente es válida y accesible.") from None
-            
-        
+        # Registro de seguimiento: construirlo no crea el archivo ni el hilo
+        if self.registro:
+            self.registro.iniciar()
+
+        # Estadísticas de zonas en vivo: output/zonas_{base}.json cada --zone-stats-secs
+        if self.args.zone_stats:
+            from zonas import EstadisticasZonas
+            archivo = None if self.args.no_save else self.unico(os.path.join(self.output_dir, f"zonas_{self.nombre_base}"), "json")
+            from zonas import mapeo_etiquetas
+            from analisisDatos import sesion_de
+            # Misma clave de sesión que analisisDatos al releer el registro
+            sesion = sesion_de(self.csv_out) if self.csv_out else os.path.basename(self.csv_base)
+            self.zonas = EstadisticasZonas(sesion, archivo, self.args.zone_stats_secs,
+                                           mapeo_etiquetas(self.zonas_config)).iniciar()
+            if self.telemetria:
+                self.telemetria.rutas["/zonas"] = self.zonas.instantanea
+
         # Configuración de la captura de video
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.res_w)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.res_h)
-        self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+        self.configurar_captura(self.cap)
 
         # Cámara secundaria
         if self.args.camera_doble and self.args.camera_sec is not None:
@@ -122,12 +203,64 @@ class HumanTracker:
             self.cap_sec.set(cv2.CAP_PROP_FRAME_HEIGHT, self.res_h)
             self.cap_sec.set(cv2.CAP_PROP_FPS, self.fps)
 
-        # Escritores
+        # Hilos de captura: la lectura y decodificación se superponen con la inferencia
+        from captura import CapturaHilo
+        # Streams de red (HLS/HTTP): se descartan frames viejos para no atrasarse respecto del vivo
+        es_stream = bool(self.args.youtube or self.args.earthcam or self.args.live)
+        max_atraso = self.args.stream_lag if es_stream and self.args.stream_lag > 0 else None
+        self.captura = CapturaHilo(self.cap, self.en_vivo, (self.res_w, self.res_h), self.args.capture_queue,
+                                   self.metricas, self.reabrir_fuente if self.en_vivo else None, max_atraso).iniciar()
+        if self.cap_sec:
+            self.captura_sec = CapturaHilo(self.cap_sec, True).iniciar()
+        if self.telemetria:
+            self.telemetria.iniciar()
+
+        # Escritores: la codificación XVID corre en hilos propios (ver grabacion.py)
+        from grabacion import EscritorVideo, GrabacionEventos
         fourcc = cv2.VideoWriter_fourcc(*"XVID")
-        if self.vid_out:
-            self.out = cv2.VideoWriter(self.vid_out, fourcc, self.fps, (self.res_w, self.res_h))
-        if self.vid_out_sec:
-            self.out_sec = cv2.VideoWriter(self.vid_out_sec, fourcc, self.fps, (self.res_w, self.res_h))
+        opciones = dict(tam_cola=self.args.record_queue, escala=self.args.record_scale, fps_salida=self.args.record_fps)
+        tam = (self.res_w, self.res_h)
+        if self.args.record_events:
+            # Un clip por evento: output/{base}_evento0001.avi, ... e índice output/{base}_eventos.csv
+            eventos = dict(pre_roll=self.args.pre_roll, post_roll=self.args.post_roll, **opciones)
+            if self.vid_out:
+                raiz = os.path.splitext(self.vid_out)[0]
+                self.out = GrabacionEventos(raiz, fourcc, self.fps, tam, self.estado_evento, self.en_vivo,
+                                            indice=f"{raiz}_eventos.csv", **eventos)
+            if self.vid_out_sec:
+                self.out_sec = GrabacionEventos(os.path.splitext(self.vid_out_sec)[0], fourcc, self.fps, tam,
+                                                self.estado_evento, True, **eventos)
+        else:
+            if self.vid_out:
+                self.out = EscritorVideo(self.vid_out, fourcc, self.fps, tam, self.en_vivo, **opciones).iniciar()
+            if self.vid_out_sec:
+                self.out_sec = EscritorVideo(self.vid_out_sec, fourcc, self.fps, tam, True, **opciones).iniciar()
+
+    def configurar_captura(self, cap):
+        import cv2
+
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.res_w)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.res_h)
+        cap.set(cv2.CAP_PROP_FPS, self.fps)
+        if self.en_vivo:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # no todos los backends lo respetan; ver CapturaHilo
+
+    # Reconexión de la fuente en vivo, llamada por el hilo de captura (con backoff exponencial)
+    # cuando el stream deja de entregar frames. Los primeros intentos reusan la URL en caché;
+    # desde el tercero se vuelve a resolver desde la página (la URL pudo haber vencido).
+    # La captura nueva pertenece al hilo de captura, que la libera al terminar: self.cap no cambia.
+    def reabrir_fuente(self, intento):
+        cap = self.abrir_fuente_principal(forzar=intento >= 2)
+        if not cap or not cap.isOpened():
+            if cap:
+                cap.release()
+            return None
+        self.configurar_captura(cap)
+        return cap
+
+    # Ventana de seguimiento (solo en modo con interfaz)
+    def iniciar_ventana(self):
+        import tkinter as tk
 
         # Tkinter GUI
         self.root = tk.Toplevel()
@@ -152,23 +285,102 @@ class HumanTracker:
             self.canvas_sec = tk.Canvas(self.root, width=640, height=480, bg="black", highlightthickness=2)
             self.canvas_sec.place(relx=1.0, rely=1.0, anchor="se") # esquina inferior derecha
 
-        self.actualizar_frame()
-        self.root.mainloop()
+        # Renderizadores: un solo ítem y un solo PhotoImage por canvas, refresco limitado
+        from pantalla import Renderizador
+        self.render = Renderizador(self.canvas, self.args.display_fps)
+        if self.canvas_sec:
+            self.render_sec = Renderizador(self.canvas_sec, self.args.display_fps, tam_fijo=(640, 480))
+
+    # Procesamiento sin interfaz: mismo pipeline en un bucle cerrado, sin Tk ni conversión de imagen
+    def process(self):
+        if self.cap is None:
+            self.preparar()
+
+        from collections import deque
+        from inferencia import InferenciaLotes
+
+        # El modelo corre en su propio hilo y agrupa frames en lotes; el bucle principal sigue
+        # leyendo mientras tanto y procesa cada frame en orden cuando su detección está lista.
+        tam_lote = max(1, self.args.batch_size)
+        self.inferencia = InferenciaLotes(self.detect_batch, tam_lote, self.args.batch_wait / 1000).iniciar()
+        pendientes = deque()
+        # La compuerta de movimiento y la detección adaptativa deciden según los tracks actuales,
+        # que al encolar están atrasados hasta 2 lotes: con ellas se decide al procesar cada frame
+        # y ese frame se detecta ahí mismo, sin lote ni superposición con la lectura
+        decidir_al_procesar = bool(self.compuerta or self.args.detect_adaptive)
 
-        # Limpieza
-        self.cap.release()
+        try:
+            while True:
+                while len(pendientes) < 2 * tam_lote:
+                    ret, idx, t, frame = self.captura.leer(timeout=0 if pendientes else 0.5)
+                    if not ret:
+                        break
+                    if decidir_al_procesar:
+                        futuro = None
+                    else:
+                        futuro = self.inferencia.enviar(0, frame) if self.debe_detectar(frame) else None
+                    pendientes.append((idx, t, frame, futuro))
+
+                if not pendientes:
+                    if self.captura.finalizado:
+                        break
+                    continue
+
+                idx, t, frame, futuro = pendientes.popleft()
+                if decidir_al_procesar:
+                    detectar = self.debe_detectar(frame)
+                    detecciones = self.detect_batch([frame])[0] if detectar else None
+                else:
+                    detectar = futuro is not None
+                    detecciones = futuro.result() if futuro else None
+                self.procesar_frame(frame, idx, detecciones, detectar=detectar, t=t)
+                if self.args.camera_doble and self.cap_sec:
+                    self.leer_secundaria()
+        except KeyboardInterrupt:
+            print("Procesamiento interrumpido.")
+        finally:
+            self.finalizar()
+
+    # Limpieza
+    def finalizar(self):
+        import cv2
+
+        if self.inferencia:
+            self.inferencia.detener()
+        if self.captura:
+            self.captura.detener()
+        if self.captura_sec:
+            self.captura_sec.detener()
+        # Cada hilo de captura libera su VideoCapture al terminar (puede seguir dentro de read()
+        # si un stream se colgó); solo se liberan acá las que no llegaron a tener hilo
+        if self.cap and not self.captura:
+            self.cap.release()
         if self.out:
-            self.out.release()
+            self.out.detener()
+            print(f"Grabación: {self.out.resumen()}")
         if self.out_sec:
-            self.out_sec.release()
-        if self.csv_out:
-            with open(self.csv_out, "w", newline="") as f:
-                csv.writer(f).writerows([("frame", "id", "zona"), *self.log])
-        if self.cap_sec:
+            self.out_sec.detener()
+            print(f"Grabación secundaria: {self.out_sec.resumen()}")
+        if self.registro:
+            try:
+                self.registro.cerrar()
+            except RuntimeError as e:
+                print(e)  # ya se informó al fallar escribir(); el resto de la limpieza sigue
+        if self.zonas:
+            self.zonas.detener()
+            print(f"Zonas: {self.zonas.filas} filas agregadas" + (f" en {self.zonas.archivo}" if self.zonas.archivo else ""))
+        if self.cap_sec and not self.captura_sec:
             self.cap_sec.release()
+        if self.servos:
+            self.servos.detener()
+        if self.telemetria:
+            self.telemetria.detener()
         if self.args.camera_doble and self.board:
             self.board.exit()
-        cv2.destroyAllWindows()
+        if not self.args.headless:
+            cv2.destroyAllWindows()  # no existe en las builds de OpenCV sin GUI de los servidores
+        if self.compuerta:
+            print(f"Compuerta de movimiento: {self.compuerta.proporcion_salteada():.1%} de los frames sin inferencia.")
         print("Finalizado.")
 
     # Generación de nombre de archivos
@@ -182,65 +394,30 @@ class HumanTracker:
         return nombre
     
     # Función para obtener la URL del stream
-    def get_stream_url(self, url):
-        import yt_dlp
-        ydl_opts = {'quiet': True, 'skip_download': True, 'format': 'best[ext=mp4]/best'}
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info_dict = ydl.extract_info(url, download=False)
-            if 'url' in info_dict:
-                return info_dict['url']
-            elif 'formats' in info_dict:
-                for fmt in info_dict['formats']:
-                    if fmt.get('vcodec') != 'none':
-                        return fmt['url']
-        raise RuntimeError("No se pudo obtener la URL del stream")
-    
-    # Inicialización del video o stream
-    def get_earthcam_stream(self, url):
-        import re
-        from selenium import webdriver
-        from selenium.webdriver.chrome.options import Options
-
-        options = Options()
-        options.add_argument('--headless')
-        options.add_argument('--disable-gpu')
-        driver = webdriver.Chrome(options=options)
-
-        try:
-            driver.get(url)
-            html = driver.page_source
-        except Exception as e:
-            driver.quit()
-            raise RuntimeError(f"No se pudo acceder a la página EarthCam: {e}")
-        try:
-            driver.get(url)
-            html = driver.page_source
-        except Exception as e:
-            driver.quit()
-            raise RuntimeError(f"No se pudo acceder a la página EarthCam: {e}")
+    # URLs de streams resueltas con caché en memoria y en disco (ver fuentes.py).
+    # Con forzar=True se ignora la caché y se vuelve a resolver desde la página.
+    def get_stream_url(self, url, forzar=False):
+        import fuentes
+        return fuentes.resolver(url, "yt_dlp", self.args.stream_ttl * 60, forzar)
 
-        driver.quit()
-        driver.quit()
+    def get_earthcam_stream(self, url, forzar=False):
+        import fuentes
+        return fuentes.resolver(url, "earthcam", self.args.stream_ttl * 60, forzar)
 
-        matches = re.findall(r'https?://[^\s"\']+\.m3u8', html)
-        if not matches:
-            raise RuntimeError("No se encontró ninguna URL de stream (.m3u8) en la página.")
-        
-        return matches[0]
-    
-    def abrir_fuente_principal(self):
+    # Inicialización del video o stream
+    def abrir_fuente_principal(self, forzar=False):
         import cv2
 
         try:
             if self.args.youtube:
-                stream_url = self.get_stream_url(self.args.youtube)
+                stream_url = self.get_stream_url(self.args.youtube, forzar)
                 return cv2.VideoCapture(stream_url)
             elif self.args.earthcam:
-                stream_url = self.get_earthcam_stream(self.args.earthcam)
+                stream_url = self.get_earthcam_stream(self.args.earthcam, forzar)
                 print(f"Conectando al stream de EarthCam: {stream_url}")
                 return cv2.VideoCapture(stream_url)
             elif self.args.live:
-                stream_url = self.get_stream_url(self.args.live)
+                stream_url = self.get_stream_url(self.args.live, forzar)
                 return cv2.VideoCapture(stream_url)
             else:
                 return cv2.VideoCapture(self.args.camera if self.args.camera is not None else self.args.video)
@@ -250,7 +427,9 @@ class HumanTracker:
     
     # Función para seleccion de persona con click
     def click_tkinter(self, event):
-        canvas_x, canvas_y = event.x, event.y
+        # El frame se muestra reducido al tamaño de la ventana: volver a coordenadas del frame
+        escala = self.render.escala if self.render else 1.0
+        canvas_x, canvas_y = event.x / escala, event.y / escala
         for i, (centro, x1, y1, w, h) in self.cands.items():
             if x1 <= canvas_x <= x1 + w and y1 <= canvas_y <= y1 + h:
                 self.id_actual = i
@@ -259,43 +438,179 @@ class HumanTracker:
     
     # Función para detectar personas
     def detect(self, frame):
+        return self.detect_batch([frame])[0]
+
+    # Función para detectar personas en varios frames con una sola llamada al modelo.
+    # Cada resultado es un array (N, 5) con x1, y1, x2, y2, confianza, en coordenadas del frame.
+    def detect_batch(self, frames):
+        import numpy as np
+
         confianza = self.confianza
-        r = self.model.predict(frame, imgsz=640, conf=confianza, verbose=False)[0]
-        outs = []
-        for b in r.boxes:
-            if int(b.cls[0]) == 0 and float(b.conf[0]) > confianza:
-                x1, y1, x2, y2 = b.xyxy[0].tolist()
-                w, h = x2 - x1, y2 - y1
-                outs.append(((int(x1 + w / 2), int(y1 + h / 2)), int(x1), int(y1), int(w), int(h)))
-        return outs
-
-    # Función para asociar detecciones con IDs
+        if self.roi:
+            # Solo se infiere sobre la región de interés; las cajas se devuelven al frame completo
+            x1, y1, x2, y2 = self.roi
+            frames = [np.ascontiguousarray(f[y1:y2, x1:x2]) for f in frames]
+        with self.metricas.etapa("detect"):
+            resultados = self.model.predict(frames, imgsz=self.imgsz, conf=confianza, classes=[0], verbose=False)
+        lotes = []
+        for r in resultados:
+            cajas = r.boxes.data.cpu().numpy()[:, :5]
+            cajas = cajas[cajas[:, 4] > confianza]
+            if self.roi:
+                cajas[:, [0, 2]] += x1
+                cajas[:, [1, 3]] += y1
+            lotes.append(cajas)
+        return lotes
+
+    # Región de interés "x1,y1,x2,y2" en píxeles del frame (a --resolution), o None para el frame completo
+    def parsear_roi(self, texto):
+        if not texto:
+            return None
+        try:
+            x1, y1, x2, y2 = map(int, texto.split(","))
+        except ValueError:
+            raise RuntimeError(f"ROI inválida: '{texto}'. Usar el formato x1,y1,x2,y2.") from None
+        x1, x2 = sorted((min(max(x1, 0), self.res_w), min(max(x2, 0), self.res_w)))
+        y1, y2 = sorted((min(max(y1, 0), self.res_h), min(max(y2, 0), self.res_h)))
+        if x2 - x1 < 32 or y2 - y1 < 32:
+            raise RuntimeError(f"La ROI {texto} es demasiado chica para la resolución {self.res_w}x{self.res_h}.")
+        return x1, y1, x2, y2
+
+    # Tamaño de inferencia: un número fijo, o "auto" para usar el lado mayor de la región
+    # analizada (ROI o frame completo) redondeado a múltiplo de 32, entre 320 y 1280. Así no se
+    # agranda una imagen chica ni se achica de más una captura de alta resolución.
+    def elegir_imgsz(self, valor):
+        if str(valor) != "auto":
+            return int(valor)
+        if self.roi:
+            w, h = self.roi[2] - self.roi[0], self.roi[3] - self.roi[1]
+        else:
+            w, h = self.res_w, self.res_h
+        return min(1280, max(320, -(-max(w, h) // 32) * 32))
+
+    # Decide si en este frame corre el detector: cada `detect_every` frames, o antes si
+    # `detect_adaptive` está activo y los tracks se volvieron inciertos. Con la compuerta de
+    # movimiento, una escena quieta y sin tracks activos no se analiza, y apenas hay movimiento
+    # se detecta en ese mismo frame. Llamar una vez por frame.
+    def debe_detectar(self, frame):
+        if self.compuerta:
+            if self.roi:
+                x1, y1, x2, y2 = self.roi
+                frame = frame[y1:y2, x1:x2]
+            movimiento = self.compuerta.hay_movimiento(frame)
+            if not self.track_memory:
+                if not movimiento:
+                    self.compuerta.salteados += 1
+                    self.desde_deteccion += 1
+                    return False
+                self.desde_deteccion = 0
+                return True
+
+        detectar = self.desde_deteccion + 1 >= self.args.detect_every or (self.args.detect_adaptive and self.tracks_inciertos())
+        self.desde_deteccion = 0 if detectar else self.desde_deteccion + 1
+        return detectar
+
+    # Un track es incierto si su posición estimada se alejó mucho de la última medición
+    # (riesgo de asociarlo mal) o si está cerca del borde (puede estar entrando o saliendo)
+    def tracks_inciertos(self):
+        for idv, info in self.track_memory.items():
+            m = self.movimiento.get(idv)
+            if m is None:
+                continue
+            if m.deriva(self.n_pasos + 1) > self.UMBRAL / 2:
+                return True
+            x1, y1, x2, y2 = info["bbox"]
+            if x1 <= 20 or y1 <= 20 or x2 >= self.res_w - 20 or y2 >= self.res_h - 20:
+                return True
+        return False
+
+    # Frames sin detección: se mueven los tracks visibles según su velocidad estimada
+    def propagar(self):
+        self.n_pasos += 1
+        vis = []
+        for idv, info in self.track_memory.items():
+            if info["lost"] > 0 or idv not in self.movimiento:
+                continue
+            x, y, w, h = self.movimiento[idv].predecir(self.n_pasos)
+            c = (x + w // 2, y + h // 2)
+            self.cands[idv] = (c, x, y, w, h)
+            vis.append((idv, c, x, y, w, h, info["conf"]))
+        return vis
+
+    # Función para asociar detecciones con IDs: matriz de distancias entre centros y
+    # asignación óptima (húngaro), descartando pares más lejanos que UMBRAL
     def associate(self, nuevos):
         import numpy as np
+        from scipy.optimize import linear_sum_assignment
+        from movimiento import VelocidadConstante
+
+        self.n_pasos += 1
+        cajas = np.asarray(nuevos, dtype=np.float32).reshape(-1, 5)
+        xy = cajas[:, :2]
+        wh = cajas[:, 2:4] - xy
+        centros = (xy + wh / 2).astype(int)
+        xy = xy.astype(int)
+        wh = wh.astype(int)
+
+        asignados = np.full(len(cajas), -1)
+        ids_viejos = list(self.cands.keys())
+        if len(cajas) and ids_viejos:
+            viejos = np.array([self.cands[i][0] for i in ids_viejos])
+            d = np.hypot(centros[:, None, 0] - viejos[None, :, 0], centros[:, None, 1] - viejos[None, :, 1])
+            filas, cols = linear_sum_assignment(np.where(d < self.UMBRAL, d, 1e9))
+            validos = d[filas, cols] < self.UMBRAL
+            asignados[filas[validos]] = np.array(ids_viejos)[cols[validos]]
+
         vis = []
-        usados = set()  # IDs ya asignados
-
-        for c, x, y, w, h in nuevos:
-            best, dmin = None, 1e9
-            for i, (c_old, *_rest) in self.cands.items():
-                if i in usados:
-                    continue  # ya asignado
-                d = np.hypot(c[0] - c_old[0], c[1] - c_old[1])
-                if d < dmin and d < self.UMBRAL:
-                    best, dmin = i, d
-            if best is not None:
-                self.cands[best] = (c, x, y, w, h)
-                usados.add(best)
-                vis.append((best, c, x, y, w, h))
-            else:
-                self.cands[self.next_id] = (c, x, y, w, h)
-                vis.append((self.next_id, c, x, y, w, h))
-                usados.add(self.next_id)
+        for k, ((cx, cy), (x, y), (w, h)) in enumerate(zip(centros.tolist(), xy.tolist(), wh.tolist())):
+            idv = int(asignados[k])
+            if idv < 0:
+                idv = self.next_id
                 self.next_id += 1
+            self.cands[idv] = ((cx, cy), x, y, w, h)
+            self.cands_visto[idv] = self.n_pasos
+            if idv in self.movimiento:
+                self.movimiento[idv].medir((x, y, w, h), self.n_pasos)
+            else:
+                self.movimiento[idv] = VelocidadConstante((x, y, w, h), self.n_pasos)
+            vis.append((idv, (cx, cy), x, y, w, h, float(cajas[k, 4])))
+
+        # Olvidar candidatos que no se ven hace más de cand_ttl frames
+        for i in [i for i, visto in self.cands_visto.items() if self.n_pasos - visto > self.cand_ttl]:
+            del self.cands[i]
+            del self.cands_visto[i]
+            self.movimiento.pop(i, None)
 
         return vis
 
     
+    # Filtros de Kalman por track, alimentados solo con mediciones reales del detector
+    def actualizar_filtros(self, vis):
+        from movimiento import FiltroKalman
+
+        for idv, (cx, cy), *_ in vis:
+            if idv in self.filtros:
+                self.filtros[idv].actualizar(cx, cy, self.t_frame)
+            else:
+                self.filtros[idv] = FiltroKalman(cx, cy, self.t_frame)
+        for i in [i for i in self.filtros if i not in self.cands]:
+            del self.filtros[i]
+
+    # Punto al que apuntar la cámara secundaria: dónde estará la persona cuando el servo llegue,
+    # es decir, la latencia medida del pipeline (captura -> ahora) más la del servo
+    def apuntar(self, idp, cx, cy):
+        import time
+
+        ahora = time.monotonic()
+        latencia = ahora - self.t_frame
+        self.latencia_pipeline = latencia if self.latencia_pipeline is None else 0.9 * self.latencia_pipeline + 0.1 * latencia
+
+        filtro = self.filtros.get(idp)
+        if filtro is None:
+            return cx, cy
+        px, py = filtro.predecir(ahora + self.args.servo_latency / 1000)
+        return min(max(int(px), 0), self.res_w - 1), min(max(int(py), 0), self.res_h - 1)
+
     # Función para mover los servos de la base rotativa
     def move_servos(self, cx, cy):
         import numpy as np
@@ -317,8 +632,7 @@ class HumanTracker:
         new_y = np.clip(self.baseY - angle_y, 75, 120) # eje invertido para Y
 
         self.servoPos = [new_x, new_y]
-        self.servo_x.write(new_x)
-        self.servo_y.write(new_y)
+        self.servos.mover(new_x, new_y)
 
     def zoom(self, frame, zoom_pct):
         import cv2
@@ -344,29 +658,133 @@ class HumanTracker:
         return cv2.resize(cropped, (w, h), interpolation=cv2.INTER_LINEAR)
 
 
+    # Bucle de la interfaz: procesa un frame y lo muestra en la ventana
     def actualizar_frame(self):
-        import cv2
-        from PIL import Image, ImageTk
-        import time
-
-        ret, self.frame = self.cap.read()
+        ret, idx, t, frame = self.captura.leer()
         if not ret:
             self.root.after(10, self.actualizar_frame)
             return
 
+        self.procesar_frame(frame, idx, t=t)
+
+        with self.metricas.etapa("display"):
+            self.render.mostrar(self.frame)
+
+        if self.args.camera_doble and self.cap_sec:
+            frame_zoom = self.leer_secundaria()
+            if frame_zoom is not None:
+                self.render_sec.mostrar(frame_zoom)
+
+        self.root.after(1, self.actualizar_frame)
+
+    # Lectura de la cámara secundaria: aplica zoom y la graba si corresponde
+    def leer_secundaria(self):
+        ret2, _, _, frame2 = self.captura_sec.leer()
+        if not ret2:
+            return None
+        self.frame2 = frame2
+        frame_zoom = self.zoom(self.frame2, self.args.zoom)
+        if self.out_sec:
+            self.out_sec.escribir(frame_zoom)
+        return frame_zoom
+
+    # Estado del frame actual para la grabación por eventos: hay evento mientras se sigue a alguien
+    def estado_evento(self):
+        ids = [i for i, info in self.track_memory.items() if info["lost"] == 0]
+        return self.frame_idx, self.t_frame, self.persona_actual is not None, ids
+
+    # Estado para la telemetría: profundidad de colas y contadores acumulados (la telemetría
+    # calcula sus tasas por segundo). Se llama desde el hilo de telemetría cada --stats-interval.
+    def estado_telemetria(self):
+        colas = {}
+        contadores = {}
+        if self.captura:
+            colas["captura"] = self.captura.cola.qsize()
+            contadores["capturados"] = self.captura.leidos
+            contadores["descartados"] = self.captura.descartados
+            contadores["reconexiones"] = self.captura.reconexiones
+            if self.captura.max_atraso is not None:
+                contadores["drenados"] = self.captura.drenados
+        if self.captura_sec:
+            colas["captura_sec"] = self.captura_sec.cola.qsize()
+            contadores["descartados_sec"] = self.captura_sec.descartados
+        if self.inferencia:
+            colas["inferencia"] = self.inferencia.cola.qsize()
+            contadores["inferencias"] = self.inferencia.frames
+        if self.registro:
+            colas["registro"] = self.registro.cola.qsize()
+        if self.out:
+            colas["grabacion"] = self.out.pendientes()
+            contadores["grabacion_descartados"] = self.out.descartados
+        if self.servos:
+            contadores["servo_pedidos"] = self.servos.pedidos
+            contadores["servo_escrituras"] = self.servos.escrituras
+            contadores["servo_suprimidos"] = self.servos.suprimidos
+        if self.render:
+            contadores["mostrados"] = self.render.mostrados
+        if self.compuerta:
+            contadores["salteados_compuerta"] = self.compuerta.salteados
+        atraso = self.captura.atraso if self.captura and self.captura.max_atraso is not None else None
+        return {
+            "atraso_fuente_ms": round(atraso * 1000) if atraso is not None else None,
+            "colas": colas,
+            "contadores": contadores,
+            "tracks": len(self.track_memory),
+            "id_actual": self.id_actual,
+            "latencia_ms": round(self.latencia_pipeline * 1000, 1) if self.latencia_pipeline is not None else None,
+        }
+
+    # Pipeline por frame: detectar -> asociar -> registrar -> mover servos -> grabar
+    # `detecciones` permite pasar el resultado ya calculado por un lote (ver process) y
+    # `detectar` la decisión ya tomada con debe_detectar; si es None se decide acá.
+    # `t` es el instante de captura (time.monotonic), usado para estimar la latencia.
+    def procesar_frame(self, frame, idx=None, detecciones=None, detectar=None, t=None):
+        import cv2
+        import time
+
+        self.frame = frame
+        self.frame_idx = idx if idx is not None else self.frame_idx + 1
+        self.t_frame = t if t is not None else time.monotonic()
         if self.frame.shape[1] != self.res_w or self.frame.shape[0] != self.res_h:
             self.frame = cv2.resize(self.frame, (self.res_w, self.res_h))
 
-        vis = self.associate(self.detect(self.frame))
-
+        if detectar is None:
+            detectar = detecciones is not None or self.debe_detectar(self.frame)
+        if detectar and detecciones is None:
+            detecciones = self.detect(self.frame)
+
+        m = self.metricas
+        with m.etapa("associate"):
+            vis = self.associate(detecciones) if detectar else self.propagar()
+            if detectar:
+                self.actualizar_filtros(vis)
+        with m.etapa("track_memory"):
+            self.actualizar_seguimiento(vis)
+        with m.etapa("draw"):
+            self.dibujar()
+        with m.etapa("log_servo"):
+            self.registrar_y_apuntar()
+        with m.etapa("write"):
+            if self.out:
+                self.out.escribir(self.frame)
+
+        if self.telemetria:
+            self.telemetria.frame()
+            if self.args.stats_overlay:
+                if self.out:
+                    self.frame = self.frame.copy()  # el escritor todavía puede estar usando el grabado
+                self.telemetria.dibujar(self.frame)  # después de grabar: solo se ve en pantalla
+
+    # Memoria de tracks (perdidos / fuera de cuadro) y selección de la persona a seguir
+    def actualizar_seguimiento(self, vis):
         # Seguimiento
         personas_detectadas = []
         ids_actuales = set()
 
-        for idv, (cx, cy), x, y, w, h in vis:
-            personas_detectadas.append({"id": idv, "centro": (cx, cy)})
+        for idv, (cx, cy), x, y, w, h, conf in vis:
+            personas_detectadas.append({"id": idv, "centro": (cx, cy), "bbox": (x, y, x + w, y + h), "conf": conf})
             ids_actuales.add(idv)
-            self.track_memory[idv] = {"bbox": (x, y, x + w, y + h), "lost": 0}  # reset
+            self.track_memory[idv] = {"bbox": (x, y, x + w, y + h), "lost": 0, "conf": conf}  # reset
 
         # Incrementar "lost" para IDs no detectados
         for track_id in list(self.track_memory.keys()):
@@ -419,7 +837,16 @@ class HumanTracker:
             else:
                 # No hay personas detectadas
                 self.persona_actual = None
-        
+
+    # Cajas, IDs y región de interés sobre self.frame
+    def dibujar(self):
+        import cv2
+
+        if self.roi and not self.args.no_boxes:
+            cv2.rectangle(self.frame, self.roi[:2], self.roi[2:], (128, 128, 128), 1)
+        if self.poligonos_zonas and not self.args.no_boxes:
+            cv2.polylines(self.frame, self.poligonos_zonas, True, (0, 200, 255), 1)
+
         for track_id, info in self.track_memory.items():
             x1, y1, x2, y2 = info["bbox"]
             color = (0, 255, 0) if self.persona_actual and track_id == self.persona_actual['id'] else (255, 0, 0)
@@ -427,44 +854,37 @@ class HumanTracker:
                 cv2.rectangle(self.frame, (x1, y1), (x2, y2), color, 2)
                 cv2.putText(self.frame, f"ID:{track_id}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
 
+    # Zona de un punto del frame: una lectura de la máscara, sin importar cuántas zonas haya
+    def zona_de(self, cx, cy):
+        if not (self.args.vidriera_mode or self.args.zones_config):
+            return "General"
+        i = self.mapa_zonas[min(max(int(cy), 0), self.res_h - 1), min(max(int(cx), 0), self.res_w - 1)]
+        return self.etiquetas[i] if i < len(self.etiquetas) else "General"
+
+    # Registro de la persona seguida y orden a los servos
+    def registrar_y_apuntar(self):
+        import time
+
         if self.persona_actual:
             self.last_det_t = time.time()
             cx, cy = self.persona_actual['centro']
-            zona = "General" if not self.args.vidriera_mode else self.etiquetas[min(cx // (self.res_w // 4), 3)]
-            self.log.append((int(self.cap.get(cv2.CAP_PROP_POS_FRAMES)), self.persona_actual['id'], zona))
+            zona = self.zona_de(cx, cy)
+            if self.registro:
+                x1, y1, x2, y2 = self.persona_actual['bbox']
+                self.registro.escribir((self.frame_idx, time.time(), self.persona_actual['id'], zona,
+                                        x1, y1, x2, y2, self.persona_actual['conf']))
+            if self.zonas:
+                # Permanencia en tiempo de la fuente: en archivos, según el número de frame
+                t = self.t_frame if self.en_vivo else self.frame_idx / self.fps
+                self.zonas.agregar(self.persona_actual['id'], zona, t)
             if self.args.camera_doble:
-                self.move_servos(cx, cy)
+                self.move_servos(*self.apuntar(self.persona_actual['id'], cx, cy))
 
         if self.args.camera_doble and time.time() - self.last_det_t > self.timeout:
-            self.servo_x.write(self.baseX)
-            self.servo_y.write(self.baseY)
+            self.servos.mover(self.baseX, self.baseY)
             self.servoPos = [self.baseX, self.baseY]
 
-        if self.out:
-            self.out.write(self.frame)
-
-        frame_rgb = cv2.cvtColor(self.frame, cv2.COLOR_BGR2RGB)
-        img_pil = Image.fromarray(frame_rgb)
-
-        img_tk = ImageTk.PhotoImage(img_pil)
-        self.canvas.img_tk = img_tk
-        self.canvas.create_image(0, 0, anchor="nw", image=img_tk)
-
-        if self.args.camera_doble and self.cap_sec:
-            ret2, self.frame2 = self.cap_sec.read()
-            if ret2:
-                frame_zoom = self.zoom(self.frame2, self.args.zoom)
-                if self.out_sec:
-                    self.out_sec.write(frame_zoom)
-                frame2_rgb = cv2.cvtColor(frame_zoom, cv2.COLOR_BGR2RGB)
-                img2_pil = Image.fromarray(frame2_rgb).resize((640, 480))
-                img2_tk = ImageTk.PhotoImage(img2_pil)
-                self.canvas_sec.img_tk = img2_tk
-                self.canvas_sec.create_image(0, 0, anchor="nw", image=img2_tk)
-
-        self.root.after(1, self.actualizar_frame)
-
-def main(args_list=None):
+def crear_parser():
     import argparse
 
     parser = argparse.ArgumentParser(description="Person Tracker con YOLOv8 + click-selector")
@@ -480,6 +900,8 @@ def main(args_list=None):
     parser.add_argument("--com", help="Puerto COM para la placa Arduino")
     parser.add_argument("--resolution", default="640x480")
     parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--imgsz", default="640", help="Tamaño de inferencia de YOLO, o 'auto' según la resolución/ROI")
+    parser.add_argument("--roi", type=str, help="Región de interés x1,y1,x2,y2 (píxeles); solo se detecta dentro de ella")
     parser.add_argument("--gainX", type=float, default=1.0, help="Ganancia de la cámara X")
     parser.add_argument("--gainY", type=float, default=1.0, help="Ganancia de la cámara Y")
     parser.add_argument("--zoom", type=float, default=110.0, help="Zoom de la cámara")
@@ -489,11 +911,51 @@ def main(args_list=None):
     parser.add_argument("--max-lost-frames", type=int, default=3)
     parser.add_argument("--servo-base-x", type=int, default=80)
     parser.add_argument("--servo-base-y", type=int, default=100)
+    parser.add_argument("--servo-rate", type=float, default=25.0, help="Máximo de órdenes por segundo a los servos")
+    parser.add_argument("--servo-deadband", type=float, default=1.0, help="No mover los servos por cambios menores a estos grados")
+    parser.add_argument("--servo-latency", type=float, default=100.0, help="Tiempo (ms) que tarda el servo en llegar; se suma a la latencia medida para anticipar el objetivo")
     parser.add_argument("--keep-frames", type=int, default=3)
     parser.add_argument("--yolo-model", type=str, default="yolov10s")
+    parser.add_argument("--backend", choices=["torch", "onnxruntime", "openvino"], default="torch", help="Motor de inferencia en CPU (el modelo se exporta la primera vez)")
+    parser.add_argument("--int8", action="store_true", help="Usar la variante cuantizada INT8 del modelo exportado")
+    parser.add_argument("--calib-video", type=str, help="Video propio para calibrar la cuantización INT8")
+    parser.add_argument("--calib-frames", type=int, default=300, help="Frames del video de calibración a usar")
+    parser.add_argument("--headless", action="store_true", help="Procesar sin ventana, a máxima velocidad (ideal para videos grabados)")
+    parser.add_argument("--display-fps", type=float, default=30.0, help="Máximo de refrescos por segundo de la ventana (independiente del procesamiento)")
+    parser.add_argument("--capture-queue", type=int, default=0, help="Tamaño de la cola de captura (0 = automático: 1 en vivo, 8 en archivos)")
+    parser.add_argument("--batch-size", type=int, default=1, help="Frames por llamada al modelo en modo headless")
+    parser.add_argument("--batch-wait", type=float, default=20.0, help="Espera máxima (ms) para completar un lote")
+    parser.add_argument("--detect-every", type=int, default=1, help="Correr YOLO cada N frames; en los intermedios se estima el movimiento")
+    parser.add_argument("--detect-adaptive", action="store_true", help="Adelantar la detección cuando los tracks se vuelven inciertos (decide frame a frame, sin lotes)")
+    parser.add_argument("--motion-gate", action="store_true", help="No correr YOLO mientras la escena esté quieta y no haya personas en seguimiento (decide frame a frame, sin lotes)")
+    parser.add_argument("--motion-threshold", type=float, default=0.002, help="Fracción de píxeles que deben cambiar para considerar que hay movimiento")
+    parser.add_argument("--cand-ttl", type=int, default=30, help="Frames sin ver a un candidato antes de olvidar su ID")
+    parser.add_argument("--log-format", choices=["csv", "parquet", "npz"], default="csv", help="Formato del registro de seguimiento (parquet requiere pyarrow)")
+    parser.add_argument("--log-flush-rows", type=int, default=500, help="Filas del registro acumuladas antes de escribir a disco")
+    parser.add_argument("--log-flush-secs", type=float, default=5.0, help="Segundos máximos entre escrituras del registro")
+    parser.add_argument("--log-rotate-mb", type=float, default=0, help="Rotar el registro al superar estos MB (0 = no rotar)")
+    parser.add_argument("--log-rotate-min", type=float, default=0, help="Rotar el registro cada estos minutos (0 = no rotar)")
+    parser.add_argument("--record-queue", type=int, default=60, help="Frames en espera de codificación por video grabado")
+    parser.add_argument("--record-scale", type=float, default=1.0, help="Escala de la grabación respecto de --resolution (p. ej. 0.5)")
+    parser.add_argument("--record-fps", type=float, help="FPS de la grabación (menor que --fps saltea frames); por defecto --fps")
+    parser.add_argument("--record-events", action="store_true", help="Grabar solo clips mientras haya una persona en seguimiento (con índice CSV)")
+    parser.add_argument("--pre-roll", type=float, default=3.0, help="Segundos previos al evento incluidos en cada clip")
+    parser.add_argument("--post-roll", type=float, default=5.0, help="Segundos sin personas antes de cerrar el clip")
+    parser.add_argument("--stream-ttl", type=float, default=30.0, help="Minutos que se reutiliza una URL de stream ya resuelta (YouTube/EarthCam)")
+    parser.add_argument("--stream-lag", type=float, default=1.0, help="Segundos de atraso respecto del vivo tolerados antes de descartar frames del stream (0 = no descartar)")
+    parser.add_argument("--zones-config", help="Archivo JSON con las zonas como polígonos (ver zonas.json); por defecto, cuatro franjas verticales")
+    parser.add_argument("--zone-stats", action="store_true", help="Calcular en vivo personas, apariciones y permanencia por zona")
+    parser.add_argument("--zone-stats-secs", type=float, default=10.0, help="Segundos entre instantáneas de las estadísticas de zonas (output/zonas_*.json)")
+    parser.add_argument("--stats-file", help="Agregar cada --stats-interval una línea JSON con la telemetría a este archivo")
+    parser.add_argument("--stats-port", type=int, help="Servir la telemetría en http://127.0.0.1:PUERTO/metrics")
+    parser.add_argument("--stats-interval", type=float, default=2.0, help="Segundos entre instantáneas de telemetría")
+    parser.add_argument("--stats-overlay", action="store_true", help="Mostrar FPS, tiempos por etapa y colas sobre la imagen (no se graba)")
 
     
-    args = parser.parse_args(args_list)
+    return parser
+
+def main(args_list=None):
+    args = crear_parser().parse_args(args_list)
 
     # Instanciar y ejecutar
     app = HumanTracker(args)
@@ -0,0 +1,125 @@
+import os
+
+
+# Exportación del modelo YOLO a backends de CPU (ONNX Runtime u OpenVINO), con variante INT8
+# opcional calibrada con frames de nuestros propios videos. El resultado se guarda junto a los
+# pesos (.pt) y se reutiliza en las siguientes ejecuciones:
+#   yolov10s_640.onnx, yolov10s_640_int8.onnx
+#   yolov10s_640_openvino_model/, yolov10s_640_int8_openvino_model/
+BACKENDS = ("torch", "onnxruntime", "openvino")
+
+
+# Devuelve la ruta a cargar con YOLO(...) para el backend pedido, exportando si hace falta
+def preparar_modelo(nombre, backend="torch", int8=False, imgsz=640, calib_video=None, calib_frames=300):
+    pt = f"{nombre}.pt"
+    if backend == "torch":
+        if int8:
+            raise RuntimeError("--int8 necesita un modelo exportado: usar --backend onnxruntime u openvino.")
+        return pt
+
+    sufijo = f"_{imgsz}" + ("_int8" if int8 else "")
+    if backend == "onnxruntime":
+        destino = f"{nombre}{sufijo}.onnx"
+        if not os.path.exists(destino):
+            base = f"{nombre}_{imgsz}.onnx"
+            if not os.path.exists(base):
+                _exportar(pt, base, format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+            if int8:
+                if not calib_video:
+                    raise RuntimeError("La cuantización INT8 con onnxruntime necesita --calib-video.")
+                cuantizar_onnx(base, destino, extraer_frames(calib_video, calib_frames), imgsz)
+        return destino
+
+    if backend == "openvino":
+        destino = f"{nombre}{sufijo}_openvino_model"
+        if not os.path.isdir(destino):
+            extra = {}
+            if int8:
+                # Sin video propio ultralytics calibraría con COCO, que no se parece a nuestras cámaras
+                if not calib_video:
+                    raise RuntimeError("La cuantización INT8 con openvino necesita --calib-video.")
+                extra["data"] = dataset_calibracion(calib_video, calib_frames, f"{nombre}_calib")
+            _exportar(pt, destino, format="openvino", imgsz=imgsz, dynamic=True, int8=int8, **extra)
+        return destino
+
+    raise ValueError(f"Backend desconocido: {backend}")
+
+
+# Exporta con ultralytics y mueve el artefacto al nombre de la caché (incluye imgsz e INT8)
+def _exportar(pt, destino, **opciones):
+    import shutil
+    from ultralytics import YOLO
+
+    print(f"Exportando {pt} -> {destino} (solo la primera vez)...")
+    generado = YOLO(pt).export(**opciones)
+    shutil.move(str(generado).rstrip("/\\"), destino)
+
+
+# Frames repartidos a lo largo de un video propio, para calibrar la cuantización
+def extraer_frames(video, n):
+    import cv2
+
+    cap = cv2.VideoCapture(video)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or n
+    paso = max(1, total // n)
+    frames = []
+    for i in range(0, total, paso):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, i)
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+        if len(frames) >= n:
+            break
+    cap.release()
+    if not frames:
+        raise RuntimeError(f"No se pudieron leer frames de calibración de {video}.")
+    return frames
+
+
+# Dataset mínimo (imágenes + yaml) en el formato que usa ultralytics para calibrar OpenVINO INT8
+def dataset_calibracion(video, n, carpeta):
+    import cv2
+
+    imagenes = os.path.join(carpeta, "images")
+    os.makedirs(imagenes, exist_ok=True)
+    for i, frame in enumerate(extraer_frames(video, n)):
+        cv2.imwrite(os.path.join(imagenes, f"calib_{i:05d}.jpg"), frame)
+
+    yaml = os.path.join(carpeta, "calib.yaml")
+    with open(yaml, "w") as f:
+        f.write(f"path: {os.path.abspath(carpeta)}\ntrain: images\nval: images\nnames:\n  0: person\n")
+    return yaml
+
+
+# Mismo preprocesamiento que ultralytics: letterbox a imgsz, BGR -> RGB, CHW, [0, 1]
+def _preprocesar(frame, imgsz):
+    import cv2
+    import numpy as np
+
+    h, w = frame.shape[:2]
+    r = min(imgsz / h, imgsz / w)
+    nw, nh = int(round(w * r)), int(round(h * r))
+    lienzo = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    y0, x0 = (imgsz - nh) // 2, (imgsz - nw) // 2
+    lienzo[y0:y0 + nh, x0:x0 + nw] = cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    return (lienzo[:, :, ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0)
+
+
+# Cuantización estática (post-entrenamiento) de un .onnx con ONNX Runtime
+def cuantizar_onnx(entrada, salida, frames, imgsz):
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    nombre_entrada = ort.InferenceSession(entrada, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    class LectorFrames(CalibrationDataReader):
+        def __init__(self):
+            self.datos = iter({nombre_entrada: _preprocesar(f, imgsz)} for f in frames)
+
+        def get_next(self):
+            return next(self.datos, None)
+
+    print(f"Cuantizando {entrada} -> {salida} con {len(frames)} frames de calibración...")
+    quantize_static(entrada, salida, LectorFrames(), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True)
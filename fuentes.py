@@ -0,0 +1,129 @@
+import json
+import os
+import re
+import threading
+import time
+
+# Resolución de páginas de streams (YouTube con yt_dlp, EarthCam con Chrome headless) a la URL
+# HLS/MP4 que abre OpenCV. Resolver cuesta varios segundos, así que el resultado se guarda en
+# memoria y en disco con vencimiento (`ttl`, o antes si la URL trae su propio "expire", como las
+# de googlevideo). La interfaz resuelve los presets en segundo plano al abrirse (preresolver) y
+# las reconexiones reusan la URL guardada antes de volver a resolver desde la página.
+ARCHIVO_CACHE = os.path.join(os.path.expanduser("~"), ".human_tracker", "streams.json")
+TTL = 30 * 60  # segundos
+MARGEN = 60  # no usar URLs a las que les queda menos de esto para vencer
+
+_cache = {}  # "tipo|url" -> [url_resuelta, vence (time.time())]
+_lock = threading.Lock()
+_en_curso = {}  # "tipo|url" -> Lock: dos pedidos simultáneos de la misma página resuelven una vez
+_disco_leido = False
+
+
+def resolver(url, tipo="yt_dlp", ttl=TTL, forzar=False):
+    clave = f"{tipo}|{url}"
+    with _lock:
+        _leer_disco()
+        lock_clave = _en_curso.setdefault(clave, threading.Lock())
+
+    with lock_clave:
+        if not forzar:
+            with _lock:
+                entrada = _cache.get(clave)
+            if entrada and entrada[1] - MARGEN > time.time():
+                return entrada[0]
+
+        resuelta = RESOLVEDORES[tipo](url)
+        ahora = time.time()
+        vence = min(ahora + ttl, _vencimiento(resuelta) or ahora + ttl)
+        with _lock:
+            _cache[clave] = [resuelta, vence]
+            _guardar_disco()
+        return resuelta
+
+
+# Resuelve una lista de URLs en un hilo aparte (las que ya están en caché no se vuelven a pedir)
+def preresolver(urls, tipo="yt_dlp", ttl=TTL):
+    def tarea():
+        for url in urls:
+            try:
+                resolver(url, tipo, ttl)
+            except Exception as e:
+                print(f"No se pudo resolver {url}: {e}")
+
+    threading.Thread(target=tarea, name="preresolver-streams", daemon=True).start()
+
+
+def resolver_yt_dlp(url):
+    import yt_dlp
+
+    ydl_opts = {'quiet': True, 'skip_download': True, 'format': 'best[ext=mp4]/best'}
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info_dict = ydl.extract_info(url, download=False)
+        if 'url' in info_dict:
+            return info_dict['url']
+        elif 'formats' in info_dict:
+            for fmt in info_dict['formats']:
+                if fmt.get('vcodec') != 'none':
+                    return fmt['url']
+    raise RuntimeError("No se pudo obtener la URL del stream")
+
+
+def resolver_earthcam(url):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    options.add_argument('--headless')
+    options.add_argument('--disable-gpu')
+    driver = webdriver.Chrome(options=options)
+
+    try:
+        driver.get(url)
+        html = driver.page_source
+    except Exception as e:
+        raise RuntimeError(f"No se pudo acceder a la página EarthCam: {e}")
+    finally:
+        driver.quit()
+
+    matches = re.findall(r'https?://[^\s"\']+\.m3u8', html)
+    if not matches:
+        raise RuntimeError("No se encontró ninguna URL de stream (.m3u8) en la página.")
+    return matches[0]
+
+
+RESOLVEDORES = {"yt_dlp": resolver_yt_dlp, "earthcam": resolver_earthcam}
+
+
+# Vencimiento propio de la URL (parámetro o segmento "expire", en segundos epoch), si lo tiene
+def _vencimiento(url):
+    m = re.search(r"[/?&]expire[=/](\d+)", url)
+    return int(m.group(1)) if m else None
+
+
+def _leer_disco():
+    global _disco_leido
+    if _disco_leido:
+        return
+    _disco_leido = True
+    try:
+        with open(ARCHIVO_CACHE) as f:
+            guardado = json.load(f)
+    except (OSError, ValueError):
+        return
+    ahora = time.time()
+    for clave, (resuelta, vence) in guardado.items():
+        if vence > ahora and clave not in _cache:
+            _cache[clave] = [resuelta, vence]
+
+
+def _guardar_disco():
+    ahora = time.time()
+    vigentes = {clave: entrada for clave, entrada in _cache.items() if entrada[1] > ahora}
+    try:
+        os.makedirs(os.path.dirname(ARCHIVO_CACHE), exist_ok=True)
+        temporal = f"{ARCHIVO_CACHE}.{os.getpid()}.tmp"
+        with open(temporal, "w") as f:
+            json.dump(vigentes, f)
+        os.replace(temporal, ARCHIVO_CACHE)  # atómico: otro proceso nunca lee un archivo a medias
+    except OSError as e:
+        print(f"No se pudo guardar la caché de streams: {e}")
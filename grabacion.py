@@ -0,0 +1,240 @@
+import queue
+import threading
+
+
+# Escritor de video en segundo plano: el bucle de seguimiento solo encola el frame y un hilo
+# propio lo codifica (cv2.VideoWriter.write libera el GIL mientras comprime). La cola es acotada:
+#   - Fuentes en vivo: política "descartar", si la cola está llena se pierde el frame de la
+#     grabación, nunca se demora el seguimiento ni los servos.
+#   - Archivos de video: política "esperar", se bloquea hasta que haya lugar (no se pierde nada).
+# `escala` < 1 graba a resolución reducida y `fps_salida` < fps graba uno de cada tantos frames;
+# el redimensionado también ocurre en el hilo del escritor.
+# Si la codificación falla (cv2.error, disco lleno, ...) el hilo guarda el error y termina; desde
+# ahí los frames se descartan en lugar de bloquear el seguimiento esperando lugar en la cola.
+class EscritorVideo:
+    def __init__(self, ruta, fourcc, fps, tam, en_vivo=True, tam_cola=60, escala=1.0, fps_salida=None):
+        self.ruta = ruta
+        self.fourcc = fourcc
+        self.fps = fps
+        self.fps_salida = min(fps_salida, fps) if fps_salida else fps
+        if escala != 1.0:
+            # Dimensiones pares: algunos códecs no aceptan impares
+            tam = (max(2, int(tam[0] * escala)) // 2 * 2, max(2, int(tam[1] * escala)) // 2 * 2)
+        self.tam = tuple(tam)
+        self.politica = "descartar" if en_vivo else "esperar"
+        self.cola = queue.Queue(maxsize=max(1, tam_cola))
+        self._acumulado = 0.0  # para saltear frames cuando fps_salida < fps
+
+        # Estadísticas
+        self.recibidos = 0
+        self.escritos = 0
+        self.descartados = 0  # por cola llena
+        self.omitidos = 0  # por fps_salida
+        self.max_cola = 0
+        self.espera = 0.0  # segundos bloqueado con la política "esperar"
+        self.error = None  # excepción que terminó el hilo del escritor
+
+        self._hilo = threading.Thread(target=self._bucle, name=f"escritor-{ruta}", daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    # Cierra el archivo después de escribir lo que quedó en la cola
+    def detener(self):
+        self.cerrar()
+        self.esperar()
+
+    # Pide el cierre sin esperar a que termine de codificar (ver esperar)
+    def cerrar(self):
+        self._encolar(None)
+
+    # Espera a que se codifique lo encolado; el tope evita colgar el cierre si el hilo no avanza
+    def esperar(self, timeout=60):
+        self._hilo.join(timeout=timeout)
+        if self._hilo.is_alive():
+            print(f"El escritor de {self.ruta} no terminó en {timeout} s; se abandona la cola pendiente.")
+
+    # El frame no debe modificarse después de encolarlo
+    def escribir(self, frame):
+        import time
+
+        self.recibidos += 1
+        self._acumulado += self.fps_salida / self.fps
+        if self._acumulado < 1.0:
+            self.omitidos += 1
+            return
+        self._acumulado -= 1.0
+
+        if self.politica == "descartar":
+            try:
+                self.cola.put_nowait(frame)
+            except queue.Full:
+                self.descartados += 1
+                return
+        else:
+            t0 = time.perf_counter()
+            encolado = self._encolar(frame)
+            self.espera += time.perf_counter() - t0
+            if not encolado:
+                self.descartados += 1
+                return
+        self.max_cola = max(self.max_cola, self.cola.qsize())
+
+    def pendientes(self):
+        return self.cola.qsize()
+
+    def resumen(self):
+        return (f"{self.escritos} frames escritos, {self.descartados} descartados por cola llena, "
+                f"{self.omitidos} omitidos por fps, cola máxima {self.max_cola}/{self.cola.maxsize}"
+                + (f" (falló: {self.error})" if self.error else ""))
+
+    # put con espera acotada: devuelve False (sin bloquearse) si el hilo del escritor ya murió
+    def _encolar(self, item):
+        while self._hilo.is_alive():
+            try:
+                self.cola.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _bucle(self):
+        try:
+            self._codificar()
+        except Exception as e:
+            self.error = e
+            print(f"Error al grabar {self.ruta}: {e}")
+
+    def _codificar(self):
+        import cv2
+
+        out = cv2.VideoWriter(self.ruta, self.fourcc, self.fps_salida, self.tam)
+        try:
+            while True:
+                frame = self.cola.get()
+                if frame is None:
+                    break
+                if (frame.shape[1], frame.shape[0]) != self.tam:
+                    frame = cv2.resize(frame, self.tam, interpolation=cv2.INTER_AREA)
+                out.write(frame)
+                self.escritos += 1
+        finally:
+            out.release()
+
+
+# Grabación por eventos: en lugar de un video continuo, un clip por cada vez que hay una persona
+# en seguimiento. Se guardan en memoria los últimos `pre_roll` segundos de frames; al empezar un
+# evento se abre un clip nuevo (con un EscritorVideo propio) que arranca con esos frames, y se
+# cierra cuando pasan `post_roll` segundos sin nadie en seguimiento. Cada clip cerrado se agrega
+# al índice CSV: clip, archivo, frame_inicio, frame_fin, inicio, fin, ids.
+# `estado` es una función sin argumentos que devuelve (frame_idx, instante, activo, ids) del
+# frame que se está grabando; así la cámara secundaria sigue los eventos de la principal.
+# Pre-roll y post-roll se cuentan en frames de la fuente (segundos * fps), así también valen al
+# procesar un archivo más rápido que el tiempo real; el instante (time.monotonic) solo se usa
+# para la hora de inicio y fin en el índice.
+class GrabacionEventos:
+    def __init__(self, raiz, fourcc, fps, tam, estado, en_vivo=True, pre_roll=3.0, post_roll=5.0,
+                 indice=None, **opciones):
+        from collections import deque
+
+        self.raiz = raiz  # los clips son {raiz}_evento0001.avi, {raiz}_evento0002.avi, ...
+        self.fourcc = fourcc
+        self.fps = fps
+        self.tam = tam
+        self.estado = estado
+        self.en_vivo = en_vivo
+        self.post_roll = max(1, int(post_roll * fps))  # en frames, como el pre-roll
+        self.indice = indice
+        self.opciones = opciones  # tam_cola, escala, fps_salida de cada EscritorVideo
+        self.buffer = deque(maxlen=max(1, int(pre_roll * fps)))  # (idx, instante, frame)
+
+        self.escritor = None
+        self.cerrados = []  # escritores que terminan de codificar en segundo plano
+        self.clip = None  # datos del clip abierto
+        self.ultimo_activo = 0  # índice del último frame con evento
+
+        # Estadísticas
+        self.clips = 0
+        self.frames_grabados = 0
+        self.frames_totales = 0
+        self._descartados_cerrados = 0
+
+    @property
+    def descartados(self):
+        return self._descartados_cerrados + (self.escritor.descartados if self.escritor else 0)
+
+    def pendientes(self):
+        return self.escritor.pendientes() if self.escritor else 0
+
+    def escribir(self, frame):
+        idx, t, activo, ids = self.estado()
+        self.frames_totales += 1
+
+        if activo:
+            self.ultimo_activo = idx
+            if self.escritor is None:
+                self._abrir(idx, t)
+        if self.escritor is None:
+            self.buffer.append((idx, t, frame))
+            return
+
+        self.escritor.escribir(frame)
+        self.frames_grabados += 1
+        self.clip["frame_fin"] = idx
+        self.clip["t_fin"] = t
+        self.clip["ids"].update(ids)
+        if not activo and idx - self.ultimo_activo >= self.post_roll:
+            self._cerrar()
+
+    def detener(self):
+        if self.escritor:
+            self._cerrar()
+        for escritor in self.cerrados:
+            escritor.esperar()
+        self.cerrados = []
+
+    def resumen(self):
+        proporcion = self.frames_grabados / self.frames_totales if self.frames_totales else 0.0
+        return (f"{self.clips} clips, {self.frames_grabados} de {self.frames_totales} frames grabados "
+                f"({proporcion:.1%}), {self.descartados} descartados por cola llena")
+
+    def _abrir(self, idx, t):
+        self.clips += 1
+        ruta = f"{self.raiz}_evento{self.clips:04d}.avi"
+        previos = list(self.buffer)
+        # La cola del clip tiene lugar extra para el pre-roll, que entra de golpe
+        opciones = dict(self.opciones, tam_cola=self.opciones.get("tam_cola", 60) + len(previos))
+        self.escritor = EscritorVideo(ruta, self.fourcc, self.fps, self.tam, self.en_vivo, **opciones).iniciar()
+        self.buffer.clear()
+        self.clip = {"clip": self.clips, "archivo": ruta, "frame_inicio": previos[0][0] if previos else idx,
+                     "t_inicio": previos[0][1] if previos else t, "frame_fin": idx, "t_fin": t, "ids": set()}
+        for _, _, f in previos:
+            self.escritor.escribir(f)
+            self.frames_grabados += 1
+
+    def _cerrar(self):
+        import csv
+        import os
+        import time
+
+        # El escritor termina de vaciar su cola en segundo plano; se espera recién al final
+        self.escritor.cerrar()
+        self.cerrados.append(self.escritor)
+        self._descartados_cerrados += self.escritor.descartados
+        self.escritor = None
+
+        if self.indice:
+            # Instantes monotónicos del pipeline -> hora local
+            desfase = time.time() - time.monotonic()
+            c = self.clip
+            nuevo = not os.path.exists(self.indice)
+            with open(self.indice, "a", newline="") as f:
+                w = csv.writer(f)
+                if nuevo:
+                    w.writerow(["clip", "archivo", "frame_inicio", "frame_fin", "inicio", "fin", "ids"])
+                w.writerow([c["clip"], os.path.basename(c["archivo"]), c["frame_inicio"], c["frame_fin"],
+                            time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(c["t_inicio"] + desfase)),
+                            time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(c["t_fin"] + desfase)),
+                            " ".join(str(i) for i in sorted(c["ids"]))])
+        self.clip = None
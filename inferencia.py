@@ -0,0 +1,79 @@
+import queue
+import threading
+from concurrent.futures import Future
+
+
+# Inferencia por lotes compartida: varias fuentes (o varios frames de una misma fuente) envían
+# frames, un hilo los agrupa hasta completar `tam_lote` o hasta que pasen `espera` segundos desde
+# el primero, corre una sola llamada a `detectar_lote` y devuelve cada resultado a quien lo pidió.
+class InferenciaLotes:
+    def __init__(self, detectar_lote, tam_lote=4, espera=0.01):
+        self.detectar_lote = detectar_lote  # función: lista de frames -> lista de detecciones
+        self.tam_lote = max(1, tam_lote)
+        self.espera = espera
+        self.cola = queue.Queue()
+
+        # Estadísticas
+        self.lotes = 0
+        self.frames = 0
+        self.por_fuente = {}
+
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name="inferencia", daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        self._hilo.join(timeout=2)
+
+    # Encola un frame de la fuente `clave` y devuelve un Future con sus detecciones
+    def enviar(self, clave, frame):
+        futuro = Future()
+        self.cola.put((clave, frame, futuro))
+        return futuro
+
+    # Tamaño medio de lote efectivamente alcanzado
+    def lote_medio(self):
+        return self.frames / self.lotes if self.lotes else 0.0
+
+    def _juntar(self):
+        import time
+
+        try:
+            primero = self.cola.get(timeout=0.1)
+        except queue.Empty:
+            return []
+
+        lote = [primero]
+        limite = time.perf_counter() + self.espera
+        while len(lote) < self.tam_lote:
+            resto = limite - time.perf_counter()
+            if resto <= 0:
+                break
+            try:
+                lote.append(self.cola.get(timeout=resto))
+            except queue.Empty:
+                break
+        return lote
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            lote = self._juntar()
+            if not lote:
+                continue
+
+            try:
+                resultados = self.detectar_lote([frame for _, frame, _ in lote])
+            except Exception as e:
+                for _, _, futuro in lote:
+                    futuro.set_exception(e)
+                continue
+
+            self.lotes += 1
+            self.frames += len(lote)
+            for (clave, _, futuro), res in zip(lote, resultados):
+                self.por_fuente[clave] = self.por_fuente.get(clave, 0) + 1
+                futuro.set_result(res)
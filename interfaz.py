@@ -1,12 +1,11 @@
 import os, subprocess, tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from PIL import Image, ImageTk
-import pandas as pd
-import matplotlib.pyplot as plt
-from serial.tools import list_ports
 import sys
 import platform
-from detectarweb import main as detectarweb_main
+
+# pandas, matplotlib, pyserial y detectarweb (que trae ultralytics/torch) se importan recién
+# cuando se usan, para que la ventana aparezca lo antes posible
 
 def resource_path(relative_path):
     base_path = getattr(sys, '_MEIPASS', os.path.abspath("."))
@@ -92,7 +91,7 @@ class TrackerGUI(tk.Frame):
         self.cam_index_sec = tk.Spinbox(scrollable_frame, from_=0, to=4, width=5)
         self.cam_index_sec.grid(row=5, column=1, sticky="w")
         self.label_com = tk.Label(scrollable_frame, text="Puerto COM:").grid(row=5, column=2, sticky="e")
-        self.combo_com = ttk.Combobox(scrollable_frame, values=self.get_arduino_ports(), width=15)
+        self.combo_com = ttk.Combobox(scrollable_frame, values=[""], width=15, postcommand=self.actualizar_puertos)
         self.combo_com.grid(row=5, column=3, sticky="w")
 
         # Parametros de video de youtube
@@ -216,6 +215,7 @@ class TrackerGUI(tk.Frame):
         self.yolo_model = ttk.Combobox(self.avanzado_frame, values=["yolov8n", "yolov8s", "yolov8m", "yolov8l", "yolov8x","yolov10n", "yolov10s", "yolov10m", "yolov10l", "yolov10x"], width=15)
         self.yolo_model.set("yolov10s")
         self.yolo_model.grid(row=5, column=3, sticky="w", pady=2)
+        self.yolo_model.bind("<<ComboboxSelected>>", lambda e: self.precalentar_modelo())
 
 
         self.draw_boxes = tk.BooleanVar(value=True)
@@ -224,6 +224,24 @@ class TrackerGUI(tk.Frame):
         self.vidriera_mode = tk.BooleanVar(value=False)
         tk.Checkbutton(self.avanzado_frame, text="Modo Vidriera", variable=self.vidriera_mode).grid(row=6, column=3, sticky="w", pady=2)
 
+        # Motor de inferencia (el modelo se exporta la primera vez que se usa)
+        lbl_backend = tk.Label(self.avanzado_frame, text="Motor de inferencia:")
+        lbl_backend.grid(row=7, column=0, sticky="e", pady=2)
+
+        self.backend = ttk.Combobox(self.avanzado_frame, values=["torch", "onnxruntime", "openvino"], state="readonly", width=15)
+        self.backend.set("torch")
+        self.backend.grid(row=7, column=1, sticky="w", pady=2)
+        self.backend.bind("<<ComboboxSelected>>", lambda e: self.precalentar_modelo())
+
+        # Tamaño de inferencia ("auto" según la resolución)
+        lbl_imgsz = tk.Label(self.avanzado_frame, text="Tamaño de inferencia:")
+        lbl_imgsz.grid(row=7, column=2, sticky="e", pady=2)
+
+        self.imgsz = ttk.Combobox(self.avanzado_frame, values=["auto", "320", "480", "640", "960", "1280"], state="readonly", width=15)
+        self.imgsz.set("640")
+        self.imgsz.grid(row=7, column=3, sticky="w", pady=2)
+        self.imgsz.bind("<<ComboboxSelected>>", lambda e: self.precalentar_modelo())
+
         # Botones de acción
         self.btn_start_nosave = tk.Button(scrollable_frame, text="Procesar sin guardar", command=self.start_tracking_no_save, width=20, height=2)
         self.btn_start_nosave.grid(row=16, column=0, columnspan=2, pady=10)
@@ -244,6 +262,24 @@ class TrackerGUI(tk.Frame):
     # Variable para trackear si está expandido
         self.avanzado_visible = True
 
+        # Después de mostrar la ventana: puertos COM y precarga del modelo en segundo plano
+        self.master.after(100, self.actualizar_puertos)
+        self.master.after(500, self.precalentar_modelo)
+        self.master.after(1000, self.preresolver_streams)
+
+    # Precarga y calentamiento del modelo mientras se completa el formulario
+    def precalentar_modelo(self):
+        import modelos
+        imgsz = self.imgsz.get()
+        if imgsz.isdigit():  # con "auto" el tamaño depende de la resolución, se carga al procesar
+            modelos.precalentar(self.yolo_model.get(), self.backend.get(), int(imgsz))
+
+    # Resolución de las URLs de los presets en segundo plano (caché compartida con detectarweb)
+    def preresolver_streams(self):
+        import fuentes
+        urls = [url for url in self.youtube_options.values() if self.get_url_type(url) == "youtube"]
+        fuentes.preresolver(urls)
+
     def toggle_avanzado(self):
         self.avanzado_visible = not self.avanzado_visible
         if self.avanzado_visible:
@@ -272,7 +308,11 @@ class TrackerGUI(tk.Frame):
             self.video_path.delete(0, tk.END)
             self.video_path.insert(0, path)
 
+    def actualizar_puertos(self):
+        self.combo_com['values'] = self.get_arduino_ports()
+
     def get_arduino_ports(self):
+        from serial.tools import list_ports
         ports = list_ports.comports()
         portsUsados =  [port.device for port in ports if "Arduino" in port.description or "CH340" in port.description or "ttyUSB" in port.device] or [port.device for port in ports]
         return portsUsados + [""]
@@ -311,6 +351,8 @@ class TrackerGUI(tk.Frame):
             "--servo-base-y", self.servo_base_y.get(),
             "--keep-frames", self.keep_frames.get(),
             "--yolo-model", self.yolo_model.get(),
+            "--backend", self.backend.get(),
+            "--imgsz", self.imgsz.get(),
         ]
 
         lista = [confianza, self.gainX_entry.get()]
@@ -361,6 +403,7 @@ class TrackerGUI(tk.Frame):
     def start_tracking(self):
         cmd = self._build_cmd(save_output=True)
         if cmd:
+            from detectarweb import main as detectarweb_main
             try:
                 detectarweb_main(cmd)  # Pasar lista completa de argumentos sin modificar
                 messagebox.showinfo("Finalizado", "Procesamiento completado y guardado en /output.")
@@ -373,6 +416,7 @@ class TrackerGUI(tk.Frame):
     def start_tracking_no_save(self):
         cmd = self._build_cmd(save_output=False)
         if cmd:
+            from detectarweb import main as detectarweb_main
             try:
                 messagebox.showinfo("Ejecutando", "Procesamiento iniciado sin guardar salida.")
                 detectarweb_main(cmd)  # Pasar lista completa de argumentos sin modificar
@@ -385,6 +429,8 @@ class TrackerGUI(tk.Frame):
     def analyze_csv(self):
         path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
         if path:
+            import pandas as pd
+            import matplotlib.pyplot as plt
             try:
                 df = pd.read_csv(path)
                 df.plot()
@@ -399,8 +445,17 @@ class TrackerGUI(tk.Frame):
             os.startfile(output_path)
 
 # Ejecutar
-root = tk.Tk()
-root.title("Human Tracker")
-root.state('zoomed')
-app = TrackerGUI(master=root)
-app.mainloop()
+if __name__ == "__main__":
+    root = tk.Tk()
+    root.title("Human Tracker")
+    root.state('zoomed')
+    app = TrackerGUI(master=root)
+
+    # Medición de arranque (ver bench_inicio.py): avisar cuando la ventana ya se dibujó y salir
+    if os.environ.get("HUMAN_TRACKER_BENCH_INICIO"):
+        def ventana_lista():
+            print("VENTANA_LISTA", flush=True)
+            root.destroy()
+        root.after_idle(ventana_lista)
+
+    app.mainloop()
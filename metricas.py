@@ -0,0 +1,227 @@
+import threading
+from collections import deque
+from contextlib import nullcontext
+from time import perf_counter
+
+
+# Tiempos por etapa del pipeline (captura, detección, asociación, ...). Cada etapa guarda sus
+# últimas `max_muestras` duraciones en segundos y se resume con percentiles. Se usa como
+#   with self.metricas.etapa("draw"):
+#       ...
+# Una misma etapa no debe medirse desde dos hilos a la vez (cada etapa corre en un solo hilo).
+class _Etapa:
+    __slots__ = ("muestras", "t0")
+
+    def __init__(self, max_muestras):
+        self.muestras = deque(maxlen=max_muestras)
+        self.t0 = 0.0
+
+    def __enter__(self):
+        self.t0 = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.muestras.append(perf_counter() - self.t0)
+        return False
+
+
+class Cronometro:
+    activo = True
+
+    def __init__(self, max_muestras=100000):
+        self.max_muestras = max_muestras
+        self.etapas = {}
+
+    def etapa(self, nombre):
+        e = self.etapas.get(nombre)
+        if e is None:
+            e = self.etapas[nombre] = _Etapa(self.max_muestras)
+        return e
+
+    # Para tiempos medidos a mano (p. ej. dentro de un bucle con continue/break)
+    def registrar(self, nombre, segundos):
+        self.etapa(nombre).muestras.append(segundos)
+
+    # {etapa: {"n", "media_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"}}
+    def resumen(self):
+        res = {}
+        for nombre, e in list(self.etapas.items()):
+            muestras = sorted(e.muestras)
+            if not muestras:
+                continue
+            n = len(muestras)
+            res[nombre] = {
+                "n": n,
+                "media_ms": 1000 * sum(muestras) / n,
+                "p50_ms": 1000 * percentil(muestras, 50),
+                "p95_ms": 1000 * percentil(muestras, 95),
+                "p99_ms": 1000 * percentil(muestras, 99),
+                "max_ms": 1000 * muestras[-1],
+            }
+        return res
+
+
+# Cronómetro apagado: etapa() devuelve siempre el mismo contexto vacío, sin medir ni guardar nada
+class CronometroNulo:
+    activo = False
+    _nulo = nullcontext()
+
+    def etapa(self, nombre):
+        return self._nulo
+
+    def registrar(self, nombre, segundos):
+        pass
+
+    def resumen(self):
+        return {}
+
+
+SIN_METRICAS = CronometroNulo()
+
+
+# Percentil con interpolación lineal sobre una lista ya ordenada
+def percentil(ordenados, p):
+    if len(ordenados) == 1:
+        return ordenados[0]
+    k = (len(ordenados) - 1) * p / 100
+    i = int(k)
+    if i + 1 >= len(ordenados):
+        return ordenados[-1]
+    return ordenados[i] + (ordenados[i + 1] - ordenados[i]) * (k - i)
+
+
+# Telemetría en vivo del tracker: tiempos por etapa sobre una ventana móvil (`ventana` muestras),
+# FPS de procesamiento, profundidad de colas, contadores (frames descartados, órdenes a servos, ...)
+# y sus tasas por segundo. Un hilo arma una instantánea cada `intervalo` segundos y la agrega a
+# un archivo JSON lines y/o la sirve por HTTP en 127.0.0.1:`puerto` (GET /metrics).
+# `estado` es una función sin argumentos que devuelve {"colas": {...}, "contadores": {...}, ...}.
+class Telemetria:
+    def __init__(self, estado, intervalo=2.0, archivo=None, puerto=None, ventana=300):
+        self.cronometro = Cronometro(ventana)
+        self.estado = estado
+        self.intervalo = max(0.1, intervalo)
+        self.archivo = archivo
+        self.puerto = puerto
+        self.tiempos = deque(maxlen=ventana)  # instantes de los últimos frames procesados
+        self.frames = 0
+        self.ultima = {}  # última instantánea: la que se sirve por HTTP y se dibuja en el frame
+        self.rutas = {"/metrics": lambda: self.ultima}  # otras vistas pueden agregar rutas
+
+        self._previo = (perf_counter(), {})
+        self._servidor = None
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name="telemetria", daemon=True)
+
+    # Si el puerto está ocupado se sigue sin HTTP (el archivo y el overlay funcionan igual): la
+    # telemetría nunca debe impedir que arranque el seguimiento
+    def iniciar(self):
+        if self.puerto:
+            try:
+                self._servidor = _servidor_http(self.puerto, self.rutas)
+            except OSError as e:
+                print(f"Telemetría: no se pudo abrir el puerto {self.puerto} ({e}); se sigue sin HTTP")
+            else:
+                threading.Thread(target=self._servidor.serve_forever, name="telemetria-http", daemon=True).start()
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        self._hilo.join(timeout=2)
+        self._publicar()  # instantánea final con los totales
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+
+    # Llamado una vez por frame procesado
+    def frame(self):
+        self.tiempos.append(perf_counter())
+        self.frames += 1
+
+    def fps(self):
+        t = list(self.tiempos)
+        return (len(t) - 1) / (t[-1] - t[0]) if len(t) > 1 and t[-1] > t[0] else 0.0
+
+    def instantanea(self):
+        import time
+
+        estado = self.estado()
+        contadores = estado.pop("contadores", {})
+        ahora = perf_counter()
+        t_previo, previos = self._previo
+        dt = ahora - t_previo
+        self._previo = (ahora, contadores)
+
+        etapas = {nombre: {k: round(v, 3) for k, v in r.items() if k != "max_ms"}
+                  for nombre, r in self.cronometro.resumen().items()}
+        return {
+            "t": round(time.time(), 3),
+            "frames": self.frames,
+            "fps": round(self.fps(), 2),
+            "etapas": etapas,
+            **estado,
+            "contadores": contadores,
+            "tasas": {f"{k}_por_s": round((v - previos.get(k, 0)) / dt, 2) for k, v in contadores.items()} if dt > 0 else {},
+        }
+
+    # Texto de la última instantánea sobre el frame (no se recalcula en cada frame)
+    def dibujar(self, frame):
+        import cv2
+
+        ultima = self.ultima
+        if not ultima:
+            return
+        lineas = [f"FPS {ultima['fps']:.1f}"]
+        if ultima.get("atraso_fuente_ms") is not None:
+            lineas.append(f"atraso vivo {ultima['atraso_fuente_ms']} ms")
+        lineas += [f"{nombre} {r['p50_ms']:.1f}/{r['p95_ms']:.1f} ms" for nombre, r in ultima["etapas"].items()]
+        lineas += [f"cola {nombre} {n}" for nombre, n in ultima.get("colas", {}).items() if n]
+        descartados = ultima["tasas"].get("descartados_por_s")
+        if descartados:
+            lineas.append(f"descartados {descartados:.1f}/s")
+        for i, texto in enumerate(lineas):
+            y = 18 + 16 * i
+            cv2.putText(frame, texto, (8, y), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 0, 0), 3)
+            cv2.putText(frame, texto, (8, y), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
+
+    def _publicar(self):
+        import json
+
+        try:
+            self.ultima = self.instantanea()
+        except Exception as e:
+            print(f"Telemetría: no se pudo armar la instantánea ({e})")
+            return
+        if self.archivo:
+            with open(self.archivo, "a") as f:
+                f.write(json.dumps(self.ultima) + "\n")
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            self._publicar()
+
+
+# Servidor HTTP local de solo lectura: cada ruta devuelve el JSON de su función
+def _servidor_http(puerto, rutas):
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            vista = rutas.get(self.path.split("?")[0])
+            if vista is None:
+                self.send_error(404)
+                return
+            cuerpo = json.dumps(vista()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", puerto), Manejador)
+    servidor.daemon_threads = True
+    return servidor
@@ -0,0 +1,57 @@
+import threading
+from collections import OrderedDict
+
+# Registro de modelos del proceso: los modelos cargados quedan en memoria entre ejecuciones
+# (por ejemplo, varios "Procesar" seguidos desde la interfaz) y se descartan por LRU cuando se
+# pide uno distinto. La clave es (modelo, backend, imgsz, int8).
+CAPACIDAD = 1
+
+_modelos = OrderedDict()
+_lock = threading.Lock()
+
+
+def obtener(nombre, backend="torch", imgsz=640, int8=False, calib_video=None, calib_frames=300):
+    clave = (nombre, backend, imgsz, int8)
+    # El lock se mantiene durante la carga: si el modelo se está precalentando en segundo plano,
+    # quien lo pide espera a que termine en lugar de cargarlo dos veces.
+    with _lock:
+        if clave in _modelos:
+            _modelos.move_to_end(clave)
+            return _modelos[clave]
+
+        modelo = _cargar(nombre, backend, imgsz, int8, calib_video, calib_frames)
+        _modelos[clave] = modelo
+        while len(_modelos) > CAPACIDAD:
+            _modelos.popitem(last=False)
+        return modelo
+
+
+# Carga y calienta el modelo en un hilo aparte (mientras el usuario completa el formulario)
+def precalentar(nombre, backend="torch", imgsz=640, int8=False):
+    def tarea():
+        try:
+            obtener(nombre, backend, imgsz, int8)
+        except Exception as e:
+            print(f"No se pudo precargar {nombre} ({backend}): {e}")
+
+    threading.Thread(target=tarea, name="precarga-modelo", daemon=True).start()
+
+
+def cargados():
+    with _lock:
+        return list(_modelos.keys())
+
+
+def _cargar(nombre, backend, imgsz, int8, calib_video, calib_frames):
+    import warnings
+    import numpy as np
+    from ultralytics import YOLO
+    from exportacion import preparar_modelo
+
+    warnings.filterwarnings("ignore", message=".*autocast.*")
+    ruta = preparar_modelo(nombre, backend, int8, imgsz, calib_video, calib_frames)
+    modelo = YOLO(ruta, task="detect")
+
+    # Inferencia de calentamiento: la primera predicción inicializa el predictor y el backend
+    modelo.predict(np.zeros((imgsz, imgsz, 3), dtype=np.uint8), imgsz=imgsz, verbose=False)
+    return modelo
@@ -0,0 +1,111 @@
+import math
+
+
+# Modelo de velocidad constante para una caja (x, y, w, h) en píxeles, con el tiempo medido en
+# pasos de seguimiento (frames procesados). Entre detecciones permite estimar dónde está la caja
+# a partir de la última medición y la velocidad suavizada.
+class VelocidadConstante:
+    def __init__(self, caja, t, alpha=0.5):
+        self.caja = caja  # última caja medida
+        self.t = t        # paso de la última medición
+        self.vx = 0.0
+        self.vy = 0.0
+        self.alpha = alpha  # peso de la velocidad nueva frente a la anterior
+
+    def medir(self, caja, t):
+        dt = t - self.t
+        if dt > 0:
+            vx = (caja[0] - self.caja[0]) / dt
+            vy = (caja[1] - self.caja[1]) / dt
+            self.vx = self.alpha * vx + (1 - self.alpha) * self.vx
+            self.vy = self.alpha * vy + (1 - self.alpha) * self.vy
+        self.caja = caja
+        self.t = t
+
+    def predecir(self, t):
+        dt = t - self.t
+        x, y, w, h = self.caja
+        return int(x + self.vx * dt), int(y + self.vy * dt), w, h
+
+    # Desplazamiento estimado (píxeles) desde la última medición hasta el paso t
+    def deriva(self, t):
+        return math.hypot(self.vx, self.vy) * (t - self.t)
+
+
+# Filtro de Kalman de velocidad constante para un punto (centro de una persona), con el tiempo
+# en segundos. Los ejes x e y son independientes, así que se resuelve cada uno con un filtro de
+# 2 estados (posición, velocidad) en Python puro, sin matrices.
+class FiltroKalman:
+    def __init__(self, x, y, t, ruido_medicion=10.0, ruido_aceleracion=800.0, horizonte_max=0.5):
+        self.r = ruido_medicion ** 2         # varianza de la detección (px²)
+        self.q = ruido_aceleracion ** 2      # varianza de la aceleración (px²/s⁴)
+        self.horizonte_max = horizonte_max   # no extrapolar más de esto (s)
+        self.t = t
+        # Estado por eje: [posición, velocidad, P00, P01, P11]
+        self.ejes = [[x, 0.0, self.r, 0.0, 1e4], [y, 0.0, self.r, 0.0, 1e4]]
+
+    def actualizar(self, x, y, t):
+        dt = max(0.0, t - self.t)
+        self.t = t
+        for eje, z in zip(self.ejes, (x, y)):
+            self._predecir_eje(eje, dt)
+            p, v, p00, p01, p11 = eje
+            s = p00 + self.r
+            k0, k1 = p00 / s, p01 / s
+            error = z - p
+            eje[:] = [p + k0 * error, v + k1 * error, (1 - k0) * p00, (1 - k0) * p01, p11 - k1 * p01]
+
+    # Posición estimada en el instante t (sin modificar el estado)
+    def predecir(self, t):
+        dt = min(max(0.0, t - self.t), self.horizonte_max)
+        return tuple(p + v * dt for p, v, *_ in self.ejes)
+
+    def velocidad(self):
+        return tuple(v for _, v, *_ in self.ejes)
+
+    def _predecir_eje(self, eje, dt):
+        p, v, p00, p01, p11 = eje
+        q = self.q
+        eje[:] = [
+            p + v * dt,
+            v,
+            p00 + 2 * dt * p01 + dt * dt * p11 + q * dt ** 4 / 4,
+            p01 + dt * p11 + q * dt ** 3 / 2,
+            p11 + q * dt * dt,
+        ]
+
+
+# Compuerta de movimiento: compara una versión chica y en grises del frame contra un fondo
+# promediado. Si cambió menos de `umbral` (fracción de píxeles), la escena está quieta y se
+# puede saltear el detector. El fondo se actualiza en cada frame para seguir cambios de luz.
+class CompuertaMovimiento:
+    def __init__(self, umbral=0.002, ancho=160, diferencia=25, aprendizaje=0.05):
+        self.umbral = umbral
+        self.ancho = ancho
+        self.diferencia = diferencia    # cambio de gris mínimo para contar un píxel como movido
+        self.aprendizaje = aprendizaje  # peso del frame nuevo en el fondo
+        self.fondo = None
+
+        # Estadísticas
+        self.evaluados = 0
+        self.salteados = 0
+
+    def hay_movimiento(self, frame):
+        import cv2
+        import numpy as np
+
+        h, w = frame.shape[:2]
+        chico = cv2.resize(frame, (self.ancho, max(1, h * self.ancho // w)), interpolation=cv2.INTER_AREA)
+        gris = cv2.GaussianBlur(cv2.cvtColor(chico, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        self.evaluados += 1
+
+        if self.fondo is None:
+            self.fondo = gris.astype(np.float32)
+            return True
+
+        cambio = cv2.absdiff(gris, cv2.convertScaleAbs(self.fondo))
+        cv2.accumulateWeighted(gris, self.fondo, self.aprendizaje)
+        return bool(np.count_nonzero(cambio > self.diferencia) > self.umbral * cambio.size)
+
+    def proporcion_salteada(self):
+        return self.salteados / self.evaluados if self.evaluados else 0.0
@@ -0,0 +1,139 @@
+import os
+import sys
+
+from detectarweb import HumanTracker, crear_parser
+
+
+# Tracker de una fuente dentro de un proceso de trabajo: no carga YOLO, manda sus frames al
+# proceso de inferencia compartido y espera las detecciones. Captura, seguimiento, registro y
+# grabación quedan en este proceso, con su propio estado y sus propias salidas.
+class TrackerRemoto(HumanTracker):
+    def __init__(self, args, fuente, pedidos, respuestas):
+        self.fuente = fuente
+        self.pedidos = pedidos
+        self.respuestas = respuestas
+        self.seq = 0
+        super().__init__(args)
+
+    def cargar_modelo(self):
+        return None
+
+    def detect_batch(self, frames):
+        import queue
+
+        primero = self.seq
+        for frame in frames:
+            self.pedidos.put((self.fuente, self.seq, frame))
+            self.seq += 1
+
+        resultados = {}
+        while len(resultados) < len(frames):
+            try:
+                seq, dets = self.respuestas.get(timeout=60)
+            except queue.Empty:
+                raise RuntimeError("El proceso de inferencia no responde.") from None
+            if dets is None:
+                raise RuntimeError("Falló la inferencia en el proceso compartido.")
+            resultados[seq] = dets
+        return [resultados[primero + k] for k in range(len(frames))]
+
+
+# Proceso de inferencia: un solo YOLO para todas las fuentes. Los pedidos de las distintas
+# fuentes se agrupan en lotes (un frame de cada una, si llegan juntos) con InferenciaLotes.
+def _trabajador_inferencia(args_list, pedidos, respuestas):
+    from inferencia import InferenciaLotes
+
+    args = crear_parser().parse_args(args_list)
+    detector = HumanTracker(args)
+    inferencia = InferenciaLotes(detector.detect_batch, args.batch_size, args.batch_wait / 1000).iniciar()
+
+    def responder(futuro, fuente, seq):
+        respuestas[fuente].put((seq, None if futuro.exception() else futuro.result()))
+
+    try:
+        while True:
+            pedido = pedidos.get()
+            if pedido is None:
+                break
+            fuente, seq, frame = pedido
+            inferencia.enviar(fuente, frame).add_done_callback(lambda f, fuente=fuente, seq=seq: responder(f, fuente, seq))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        inferencia.detener()
+        print(f"Inferencia: {inferencia.frames} frames en {inferencia.lotes} lotes (lote medio {inferencia.lote_medio():.2f})")
+
+
+def _trabajador_fuente(fuente, args_list, pedidos, respuestas):
+    args = crear_parser().parse_args(args_list)
+    tracker = TrackerRemoto(args, fuente, pedidos, respuestas[fuente])
+    tracker.process()
+
+
+# Traduce una fuente a los argumentos de detectarweb: índice de cámara, archivo o URL
+def argumentos_fuente(fuente):
+    if fuente.isdigit():
+        return ["--camera", fuente]
+    if os.path.isfile(fuente):
+        return ["--video", fuente]
+    if "youtube.com" in fuente or "youtu.be" in fuente:
+        return ["--youtube", fuente]
+    if "earthcam.com" in fuente:
+        return ["--earthcam", fuente]
+    return ["--live", fuente]
+
+
+def main(args_list=None):
+    import argparse
+    import multiprocessing as mp
+
+    # Opciones propias del supervisor; el resto son las de detectarweb y se pasan a cada fuente
+    parser = argparse.ArgumentParser(description="Seguimiento de varias cámaras/streams en un solo equipo con un YOLO compartido")
+    parser.add_argument("--sources", nargs="+", required=True, help="Fuentes: índices de cámara, archivos de video o URLs")
+    parser.add_argument("--inference-workers", type=int, default=1, help="Procesos de inferencia (cada uno carga su modelo)")
+    propios, comunes = parser.parse_known_args(args_list)
+    args = crear_parser().parse_args(comunes)
+
+    n = len(propios.sources)
+    pedidos = mp.Queue(maxsize=4 * n)
+    respuestas = [mp.Queue() for _ in range(n)]
+
+    # Por defecto el lote de inferencia es un frame de cada fuente
+    args_inferencia = comunes + ["--batch-size", str(max(args.batch_size, n))]
+    inferencia = [mp.Process(target=_trabajador_inferencia, args=(args_inferencia, pedidos, respuestas), daemon=True)
+                  for _ in range(max(1, propios.inference_workers))]
+    for p in inferencia:
+        p.start()
+
+    fuentes = []
+    for i, fuente in enumerate(propios.sources):
+        args_fuente = comunes + argumentos_fuente(fuente) + ["--out-base", f"{args.out_base}_{i}", "--headless"]
+        # Telemetría por fuente: puerto PUERTO+i y archivo {raiz}_{i}.ext (argparse usa el último valor)
+        if args.stats_port:
+            args_fuente += ["--stats-port", str(args.stats_port + i)]
+        if args.stats_file:
+            raiz, ext = os.path.splitext(args.stats_file)
+            args_fuente += ["--stats-file", f"{raiz}_{i}{ext}"]
+        p = mp.Process(target=_trabajador_fuente, args=(i, args_fuente, pedidos, respuestas), name=f"fuente{i}")
+        p.start()
+        fuentes.append(p)
+
+    try:
+        for p in fuentes:
+            p.join()
+    except KeyboardInterrupt:
+        for p in fuentes:
+            p.join()
+    finally:
+        for _ in inferencia:
+            pedidos.put(None)
+        for p in inferencia:
+            p.join(timeout=10)
+
+    print("Finalizado.")
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
+    main(sys.argv[1:])
@@ -0,0 +1,59 @@
+# Renderizador de frames en un canvas de Tkinter. Reutiliza un único ítem del canvas y un único
+# PhotoImage (se le pega la imagen nueva con paste), reduce el frame al tamaño visible antes de
+# convertirlo y limita los refrescos a `max_fps`, independiente de la velocidad de procesamiento.
+class Renderizador:
+    def __init__(self, canvas, max_fps=30.0, tam_fijo=None):
+        self.canvas = canvas
+        self.intervalo = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.tam_fijo = tam_fijo  # (ancho, alto) forzado, p. ej. la cámara secundaria
+        self.escala = 1.0  # píxeles de canvas por píxel de frame (para mapear clicks)
+        self.item = None
+        self.foto = None
+        self.ultimo = 0.0
+
+        # Estadísticas
+        self.mostrados = 0
+        self.salteados = 0
+
+    def mostrar(self, frame):
+        import time
+        from PIL import ImageTk
+
+        ahora = time.monotonic()
+        if ahora - self.ultimo < self.intervalo:
+            self.salteados += 1
+            return False
+        self.ultimo = ahora
+
+        img = self.convertir(frame)
+        w, h = img.size
+
+        if self.foto is None or (self.foto.width(), self.foto.height()) != (w, h):
+            self.foto = ImageTk.PhotoImage(img)
+            if self.item is None:
+                self.item = self.canvas.create_image(0, 0, anchor="nw", image=self.foto)
+            else:
+                self.canvas.itemconfig(self.item, image=self.foto)
+        else:
+            self.foto.paste(img)
+
+        self.mostrados += 1
+        return True
+
+    # Reducción y conversión a imagen PIL: la parte costosa de mostrar, sin tocar Tk
+    def convertir(self, frame):
+        import cv2
+        from PIL import Image
+
+        fh, fw = frame.shape[:2]
+        if self.tam_fijo:
+            w, h = self.tam_fijo
+        else:
+            # Solo se achica: nunca se paga una conversión más grande que el frame
+            cw, ch = self.canvas.winfo_width(), self.canvas.winfo_height()
+            self.escala = min(1.0, cw / fw, ch / fh) if cw > 1 and ch > 1 else 1.0
+            w, h = max(1, int(fw * self.escala)), max(1, int(fh * self.escala))
+
+        if (w, h) != (fw, fh):
+            frame = cv2.resize(frame, (w, h), interpolation=cv2.INTER_AREA)
+        return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
@@ -0,0 +1,295 @@
+import os
+import queue
+import threading
+
+
+# Registro de seguimiento en disco: las filas se encolan desde el bucle principal y un hilo
+# las escribe cada `filas_flush` filas o cada `segundos_flush` segundos, lo que ocurra primero.
+# La cola está acotada, así la memoria no crece con la duración de la sesión, y lo ya escrito
+# sobrevive a un corte. Opcionalmente rota el archivo por tamaño (MB) o por tiempo (minutos).
+# Cada fila tiene las columnas de COLUMNAS; cada formato decide cuáles guarda.
+# Si la escritura falla (disco lleno, permisos, ...) el hilo guarda el error y termina; desde ahí
+# escribir() y cerrar() lo relanzan en lugar de quedar bloqueados esperando lugar en la cola.
+COLUMNAS = ("frame", "timestamp", "id", "zona", "x1", "y1", "x2", "y2", "conf")
+
+
+class RegistroSeguimiento:
+    EXTENSION = None
+
+    def __init__(self, ruta, filas_flush=500, segundos_flush=5.0, rotar_mb=0, rotar_min=0):
+        self.ruta = ruta
+        self.raiz = os.path.splitext(ruta)[0]
+        self.filas_flush = max(1, filas_flush)
+        self.segundos_flush = max(0.1, segundos_flush)
+        self.rotar_bytes = rotar_mb * 1024 * 1024
+        self.rotar_segundos = rotar_min * 60
+
+        self.archivos = []  # rutas escritas, en orden
+        self.filas = 0
+        self.parte = 0
+        self.abierto_t = 0.0
+        self.f = None
+        self.error = None  # excepción que terminó el hilo de escritura
+
+        self.cola = queue.Queue(maxsize=self.filas_flush * 4)
+        self._hilo = threading.Thread(target=self._bucle, name="registro", daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    def escribir(self, fila):
+        self._encolar(fila)
+
+    def cerrar(self):
+        if self._hilo.is_alive():
+            try:
+                self._encolar(None)
+            finally:
+                self._hilo.join(timeout=10)
+        self._relanzar()
+
+    # put con espera acotada: nunca se bloquea para siempre si el hilo de escritura ya murió
+    def _encolar(self, item):
+        while True:
+            self._verificar()
+            try:
+                self.cola.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _verificar(self):
+        self._relanzar()
+        if not self._hilo.is_alive():
+            raise RuntimeError(f"El hilo de escritura del registro {self.ruta} no está corriendo.")
+
+    def _relanzar(self):
+        if self.error is not None:
+            raise RuntimeError(f"Falló la escritura del registro {self.ruta}: {self.error}") from self.error
+
+    def _bucle(self):
+        try:
+            self._escribir_todo()
+        except Exception as e:
+            self.error = e
+            print(f"Error al escribir el registro {self.ruta}: {e}")
+            if self.f:
+                try:
+                    self._cerrar_archivo()
+                except Exception:
+                    pass
+
+    def _escribir_todo(self):
+        import time
+
+        self._volcar([])  # crea el primer archivo con su encabezado aunque no haya filas
+        pendientes = []
+        ultimo_flush = time.monotonic()
+        fin = False
+        while not fin:
+            espera = max(0.0, self.segundos_flush - (time.monotonic() - ultimo_flush))
+            try:
+                fila = self.cola.get(timeout=espera)
+                if fila is None:
+                    fin = True
+                else:
+                    pendientes.append(fila)
+            except queue.Empty:
+                pass
+
+            if fin or len(pendientes) >= self.filas_flush or time.monotonic() - ultimo_flush >= self.segundos_flush:
+                if pendientes:
+                    self._volcar(pendientes)
+                    pendientes = []
+                ultimo_flush = time.monotonic()
+
+        if self.f:
+            self._cerrar_archivo()
+
+    def _volcar(self, filas):
+        import time
+
+        if self.f and self._debe_rotar():
+            self._cerrar_archivo()
+        if not self.f:
+            ruta = self.ruta if self.parte == 0 else f"{self.raiz}_parte{self.parte}.{self.EXTENSION}"
+            self.parte += 1
+            self._abrir_archivo(ruta)
+            self.archivos.append(ruta)
+            self.abierto_t = time.monotonic()
+
+        self._escribir_filas(filas)
+        self.filas += len(filas)
+
+    def _debe_rotar(self):
+        import time
+
+        if self.rotar_bytes and self._tamano() >= self.rotar_bytes:
+            return True
+        return bool(self.rotar_segundos) and time.monotonic() - self.abierto_t >= self.rotar_segundos
+
+    # Cada formato implementa estos métodos; `self.f` es el archivo/escritor abierto o None
+    def _abrir_archivo(self, ruta):
+        raise NotImplementedError
+
+    def _escribir_filas(self, filas):
+        raise NotImplementedError
+
+    def _tamano(self):
+        raise NotImplementedError
+
+    def _cerrar_archivo(self):
+        raise NotImplementedError
+
+
+# CSV: solo frame, id y zona (las columnas que lee analisisDatos.py)
+class RegistroCsv(RegistroSeguimiento):
+    EXTENSION = "csv"
+    ENCABEZADO = ("frame", "id", "zona")
+
+    def _abrir_archivo(self, ruta):
+        import csv
+
+        self.f = open(ruta, "w", newline="")
+        self._csv = csv.writer(self.f)
+        self._csv.writerow(self.ENCABEZADO)
+
+    def _escribir_filas(self, filas):
+        self._csv.writerows((fila[0], fila[2], fila[3]) for fila in filas)
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    def _tamano(self):
+        return self.f.tell()
+
+    def _cerrar_archivo(self):
+        self.f.close()
+        self.f = None
+
+
+# Columnas tipadas a partir de una lista de filas
+def _a_columnas(filas):
+    import numpy as np
+
+    frame, timestamp, ids, zona, x1, y1, x2, y2, conf = zip(*filas)
+    return {
+        "frame": np.array(frame, dtype=np.int64),
+        "timestamp": np.array(timestamp, dtype=np.float64),
+        "id": np.array(ids, dtype=np.int32),
+        "zona": list(zona),
+        "x1": np.array(x1, dtype=np.int16),
+        "y1": np.array(y1, dtype=np.int16),
+        "x2": np.array(x2, dtype=np.int16),
+        "y2": np.array(y2, dtype=np.int16),
+        "conf": np.array(conf, dtype=np.float32),
+    }
+
+
+# Parquet (requiere pyarrow): cada volcado es un row group, la zona se guarda como diccionario.
+# El pie del archivo se escribe al cerrarlo; conviene combinarlo con rotación en sesiones largas.
+class RegistroParquet(RegistroSeguimiento):
+    EXTENSION = "parquet"
+
+    # pyarrow se verifica al construir, no recién en el hilo de escritura
+    def __init__(self, *args, **kwargs):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise RuntimeError("--log-format parquet requiere pyarrow (pip install pyarrow).") from e
+        super().__init__(*args, **kwargs)
+
+    def _abrir_archivo(self, ruta):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._schema = pa.schema([
+            ("frame", pa.int64()),
+            ("timestamp", pa.float64()),
+            ("id", pa.int32()),
+            ("zona", pa.dictionary(pa.int16(), pa.string())),  # int16: alcanza para las 254 zonas de cargar_zonas
+            ("x1", pa.int16()),
+            ("y1", pa.int16()),
+            ("x2", pa.int16()),
+            ("y2", pa.int16()),
+            ("conf", pa.float32()),
+        ])
+        self._ruta_actual = ruta
+        self.f = pq.ParquetWriter(ruta, self._schema, compression="zstd")
+
+    def _escribir_filas(self, filas):
+        import pyarrow as pa
+
+        if not filas:
+            return
+        cols = _a_columnas(filas)
+        cols["zona"] = pa.array(cols["zona"]).dictionary_encode().cast(self._schema.field("zona").type)
+        self.f.write_table(pa.Table.from_pydict(cols, schema=self._schema))
+
+    def _tamano(self):
+        return os.path.getsize(self._ruta_actual)
+
+    def _cerrar_archivo(self):
+        self.f.close()
+        self.f = None
+
+
+# NPZ por bloques (solo numpy): la "ruta" es una carpeta con un bloque_NNNNNN.npz por volcado.
+# Cada bloque queda completo en disco apenas se escribe, y np.load lee solo las columnas pedidas.
+class RegistroNpz(RegistroSeguimiento):
+    EXTENSION = "npz"
+
+    def _abrir_archivo(self, ruta):
+        os.makedirs(ruta, exist_ok=True)
+        self.f = ruta
+        self._bloques = 0
+        self._bytes = 0
+
+    def _escribir_filas(self, filas):
+        import numpy as np
+
+        if not filas:
+            return
+        cols = _a_columnas(filas)
+        zonas, codigos = np.unique(np.array(cols["zona"]), return_inverse=True)
+        cols["zona"] = codigos.astype(np.int16)  # con int8 más de 127 zonas darían códigos negativos
+        cols["zonas"] = zonas  # nombres de zona para decodificar `zona`
+
+        ruta = os.path.join(self.f, f"bloque_{self._bloques:06d}.npz")
+        np.savez(ruta, **cols)
+        self._bloques += 1
+        self._bytes += os.path.getsize(ruta)
+
+    def _tamano(self):
+        return self._bytes
+
+    def _cerrar_archivo(self):
+        self.f = None
+
+
+FORMATOS = {"csv": RegistroCsv, "parquet": RegistroParquet, "npz": RegistroNpz}
+
+
+# Lectura de un registro en cualquiera de los formatos, opcionalmente solo algunas columnas.
+# Devuelve un DataFrame de pandas.
+def leer_registro(ruta, columnas=None):
+    import pandas as pd
+
+    if ruta.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return pq.read_table(ruta, columns=columnas, memory_map=True).to_pandas()
+
+    if ruta.endswith(".npz") and os.path.isdir(ruta):
+        import numpy as np
+
+        partes = []
+        for nombre in sorted(os.listdir(ruta)):
+            with np.load(os.path.join(ruta, nombre)) as bloque:
+                cols = {c: bloque[c] for c in (columnas or COLUMNAS)}
+                if "zona" in cols:
+                    cols["zona"] = bloque["zonas"][cols["zona"]]
+            partes.append(pd.DataFrame(cols))
+        return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=columnas or COLUMNAS)
+
+    return pd.read_csv(ruta, usecols=columnas, encoding="latin1")
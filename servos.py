@@ -0,0 +1,76 @@
+import threading
+
+
+# Canal asíncrono hacia los servos de la base rotativa. El bucle principal solo deja la última
+# posición pedida en un buzón (no bloquea); un hilo la escribe por Firmata respetando una tasa
+# máxima de órdenes por segundo y una zona muerta: no se mandan movimientos menores a
+# `zona_muerta` grados ni órdenes que no cambian el ángulo ya escrito.
+class CanalServos:
+    def __init__(self, servo_x, servo_y, pos_inicial, max_hz=25.0, zona_muerta=1.0):
+        self.servo_x = servo_x
+        self.servo_y = servo_y
+        self.intervalo = 1.0 / max_hz if max_hz > 0 else 0.0
+        self.zona_muerta = zona_muerta
+        self.escrito = [int(round(pos_inicial[0])), int(round(pos_inicial[1]))]
+
+        # Estadísticas
+        self.pedidos = 0
+        self.escrituras = 0
+        self.suprimidos = 0
+
+        self._buzon = None
+        self._cond = threading.Condition()
+        self._detener = False
+        self._hilo = threading.Thread(target=self._bucle, name="servos", daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        with self._cond:
+            self._detener = True
+            self._cond.notify()
+        self._hilo.join(timeout=2)
+
+    # Pide mover a (x, y) grados; reemplaza cualquier pedido anterior aún no escrito
+    def mover(self, x, y):
+        with self._cond:
+            if self._buzon is not None:
+                self.suprimidos += 1
+            self._buzon = (x, y)
+            self.pedidos += 1
+            self._cond.notify()
+
+    def _bucle(self):
+        import time
+
+        ultimo = 0.0
+        while True:
+            with self._cond:
+                while self._buzon is None and not self._detener:
+                    self._cond.wait()
+                if self._detener:
+                    return
+
+            # Respetar la tasa máxima; mientras tanto el buzón puede recibir un valor más nuevo
+            espera = self.intervalo - (time.monotonic() - ultimo)
+            if espera > 0:
+                time.sleep(espera)
+
+            with self._cond:
+                x, y = self._buzon
+                self._buzon = None
+
+            nuevo = [int(round(x)), int(round(y))]
+            if max(abs(nuevo[0] - self.escrito[0]), abs(nuevo[1] - self.escrito[1])) < self.zona_muerta or nuevo == self.escrito:
+                self.suprimidos += 1
+                continue
+
+            if nuevo[0] != self.escrito[0]:
+                self.servo_x.write(nuevo[0])
+            if nuevo[1] != self.escrito[1]:
+                self.servo_y.write(nuevo[1])
+            self.escrito = nuevo
+            self.escrituras += 1
+            ultimo = time.monotonic()
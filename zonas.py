@@ -0,0 +1,137 @@
+import json
+import threading
+
+# Zonas del modo vidriera: polígonos con coordenadas normalizadas (0-1, relativas al frame), en un
+# archivo JSON como zonas.json:
+#   {"zonas": [{"nombre": "Izquierda", "etiqueta": "Izquierda", "poligono": [[0, 0], [0.25, 0], ...]}, ...]}
+# `nombre` es lo que se guarda en el registro y `etiqueta` el nombre en los reportes. Si dos
+# polígonos se superponen, manda el que aparece después. Sin archivo: cuatro franjas verticales.
+ZONAS_POR_DEFECTO = [
+    {"nombre": "Izquierda", "etiqueta": "Izquierda", "poligono": [[0, 0], [0.25, 0], [0.25, 1], [0, 1]]},
+    {"nombre": "Centro-Izq", "etiqueta": "Centro Izquierda", "poligono": [[0.25, 0], [0.5, 0], [0.5, 1], [0.25, 1]]},
+    {"nombre": "Centro-Der", "etiqueta": "Centro Derecha", "poligono": [[0.5, 0], [0.75, 0], [0.75, 1], [0.5, 1]]},
+    {"nombre": "Derecha", "etiqueta": "Derecha", "poligono": [[0.75, 0], [1, 0], [1, 1], [0.75, 1]]},
+]
+SIN_ZONA = 255  # valor de la máscara fuera de todos los polígonos
+
+
+def cargar_zonas(ruta=None):
+    if not ruta:
+        return ZONAS_POR_DEFECTO
+    with open(ruta, encoding="utf-8") as f:
+        zonas = json.load(f).get("zonas", [])
+    if not zonas or len(zonas) >= SIN_ZONA:
+        raise ValueError(f"{ruta}: se necesitan entre 1 y {SIN_ZONA - 1} zonas.")
+    for z in zonas:
+        if "nombre" not in z or len(z.get("poligono", [])) < 3:
+            raise ValueError(f"{ruta}: cada zona necesita 'nombre' y un 'poligono' de al menos 3 puntos.")
+        z.setdefault("etiqueta", z["nombre"])
+    return zonas
+
+
+# Nombre en el registro -> etiqueta en los reportes
+def mapeo_etiquetas(zonas):
+    return {z["nombre"]: z["etiqueta"] for z in zonas}
+
+
+# Polígonos en píxeles para un frame de ancho x alto
+def poligonos_px(zonas, ancho, alto):
+    import numpy as np
+
+    return [np.round(np.array(z["poligono"], dtype=np.float64) * (ancho, alto)).astype(np.int32) for z in zonas]
+
+
+# Rasteriza las zonas una sola vez en una máscara (alto, ancho) uint8 con el índice de zona de
+# cada píxel (SIN_ZONA fuera de todas): la zona de un punto es mascara[cy, cx].
+def mascara_zonas(zonas, ancho, alto):
+    import cv2
+    import numpy as np
+
+    mascara = np.full((alto, ancho), SIN_ZONA, dtype=np.uint8)
+    for i, poligono in enumerate(poligonos_px(zonas, ancho, alto)):
+        cv2.fillPoly(mascara, [poligono], i)
+    return mascara
+
+
+# Estadísticas de zonas en vivo: los mismos agregados que analisisDatos (personas únicas y
+# apariciones por zona, frames por ID y zona, en un ParcialZonas) más el tiempo de permanencia en
+# segundos, actualizados en O(1) por cada fila del registro en lugar de releer el CSV al final.
+# Un hilo guarda una instantánea JSON cada `intervalo` segundos (reemplazo atómico del archivo) y
+# `instantanea()` se puede consultar en cualquier momento (p. ej. GET /zonas de la telemetría).
+class EstadisticasZonas:
+    HUECO_MAX = 1.0  # segundos: si una persona no se registró por más tiempo, el hueco no suma
+
+    def __init__(self, sesion, archivo=None, intervalo=10.0, mapeo=None):
+        from analisisDatos import ParcialZonas, mapeo_zonas
+
+        self.sesion = sesion  # como en analisisDatos, una persona es (sesión, ID)
+        self.archivo = archivo
+        self.intervalo = max(0.5, intervalo)
+        self.mapeo = mapeo if mapeo is not None else mapeo_zonas  # nombre en el registro -> etiqueta
+        self.parcial = ParcialZonas()
+        self.segundos = {}  # (ID, zona) -> segundos de permanencia
+        self.ultimo = {}  # ID -> (zona, instante) de su última fila
+        self.filas = 0
+
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name="zonas", daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        self._hilo.join(timeout=2)
+        self._guardar()
+
+    # Una fila del registro: la persona `idp` está en `zona` en el instante `t` (segundos)
+    def agregar(self, idp, zona, t):
+        zona = self.mapeo.get(zona, zona)
+        with self._lock:
+            self.parcial.agregar(self.sesion, idp, zona)
+            previo = self.ultimo.get(idp)
+            if previo is not None:
+                zona_previa, t_previo = previo
+                dt = t - t_previo
+                if 0 < dt <= self.HUECO_MAX:
+                    clave = (idp, zona_previa)
+                    self.segundos[clave] = self.segundos.get(clave, 0.0) + dt
+            self.ultimo[idp] = (zona, t)
+            self.filas += 1
+
+    def instantanea(self):
+        import time
+
+        with self._lock:
+            zonas = {}
+            for zona, n in self.parcial.apariciones.items():
+                zonas[zona] = {"personas": len(self.parcial.personas.get(zona, ())), "apariciones": n, "segundos": 0.0}
+            por_id = []
+            for (_, idp, zona), frames in sorted(self.parcial.frames.items()):
+                segundos = self.segundos.get((idp, zona), 0.0)
+                zonas[zona]["segundos"] += segundos
+                por_id.append({"id": idp, "zona": zona, "frames": frames, "segundos": round(segundos, 2)})
+            filas = self.filas
+        for z in zonas.values():
+            z["segundos"] = round(z["segundos"], 2)
+        return {"t": round(time.time(), 3), "sesion": self.sesion, "filas": filas, "zonas": zonas, "por_id": por_id}
+
+    def _guardar(self):
+        import json
+        import os
+
+        if not self.archivo:
+            return
+        temporal = f"{self.archivo}.tmp"
+        try:
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(self.instantanea(), f, ensure_ascii=False)
+            os.replace(temporal, self.archivo)  # los tableros nunca leen un archivo a medias
+        except OSError as e:
+            print(f"No se pudo guardar la instantánea de zonas: {e}")
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            self._guardar()